@@ -0,0 +1,61 @@
+"""raw_to_uW_cm2 cost: the old per-call formula, the table lookup and the batch API.
+
+    python -m benchmarks.bench_convert [records]
+
+Records get random raw counts and random gain/time codes, as when
+reprocessing a log recorded with auto-ranging.
+"""
+import sys
+import time
+
+import numpy as np
+
+from lib import uvconvert
+
+RE_BASE_UVA = 385
+RE_BASE_UVB = 347
+BASE_TIME_MS = 64
+
+
+def legacy(uva_raw, uvb_raw, gain, time_ms):
+    gain_factor = gain / 2048.0
+    time_factor = BASE_TIME_MS / float(time_ms)
+    Re_uva = RE_BASE_UVA * gain_factor
+    Re_uvb = RE_BASE_UVB * gain_factor
+    return (uva_raw / Re_uva) * time_factor, (uvb_raw / Re_uvb) * time_factor
+
+
+def main(records = 1000000):
+    rng = np.random.default_rng(0)
+    raw = rng.integers(0, 65536, (3, records), dtype = np.uint16)
+    gain_codes = rng.integers(0, uvconvert.GAIN_CODES, records, dtype = np.uint8)
+    time_codes = rng.integers(0, 7, records, dtype = np.uint8)
+    temp = rng.integers(0, 4096, records, dtype = np.uint16)
+    conv = uvconvert.Converter()
+
+    n = min(records, 200000)
+    ua, ub = raw[0, :n].tolist(), raw[1, :n].tolist()
+    gains = [uvconvert.gain_of_code(c) for c in gain_codes[:n].tolist()]
+    times = [uvconvert.time_ms_of_code(c) for c in time_codes[:n].tolist()]
+
+    start = time.perf_counter()
+    old = [legacy(a, b, g, t) for a, b, g, t in zip(ua, ub, gains, times)]
+    t_legacy = (time.perf_counter() - start) / n * 1e9
+    start = time.perf_counter()
+    new = [conv.scalar(a, b, g, t) for a, b, g, t in zip(ua, ub, gains, times)]
+    t_scalar = (time.perf_counter() - start) / n * 1e9
+    assert np.allclose(old, new, rtol = 1e-12)
+
+    conv.batch(raw[0, :10], raw[1, :10], raw[2, :10], gain_codes[:10], time_codes[:10])
+    start = time.perf_counter()
+    uva, uvb, uvc, temp_c = conv.batch(raw[0], raw[1], raw[2], gain_codes, time_codes, temp)
+    t_batch = (time.perf_counter() - start) / records * 1e9
+    assert np.allclose(uva[:n], [o[0] for o in old], rtol = 1e-12)
+
+    print("legacy scalar {:8.1f} ns/record".format(t_legacy))
+    print("table scalar  {:8.1f} ns/record".format(t_scalar))
+    print("batch         {:8.1f} ns/record  ({} records, UVA/UVB/UVC + temperature)".format(t_batch, records))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,78 @@
+"""DC pin toggles per second through RaspberryPi.digital_write, per GPIO backend.
+
+    python -m benchmarks.bench_gpio [toggles]
+
+Off the Pi this runs gpiozero on its MockFactory and the register writer
+on plain memory ("sim"); on the Pi it also tries "gpiozero" on the real
+pin factory, "lgpio" and "gpiomem", and skips the ones that cannot be
+opened. Each backend drives a LCD_1inch14 instance, so the numbers include
+digital_write itself, exactly as the drivers call it.
+"""
+import contextlib
+import os
+import sys
+import time
+
+import lib
+from lib import sim
+
+
+def toggles_per_s(disp, toggles):
+    write = disp.digital_write
+    pin = disp.DC_PIN
+    start = time.perf_counter()
+    for _ in range(toggles // 2):
+        write(pin, True)
+        write(pin, False)
+    return toggles / (time.perf_counter() - start)
+
+
+def check(disp):
+    """The pin really follows digital_write"""
+    disp.digital_write(disp.DC_PIN, True)
+    high = disp.DC_PIN.value
+    disp.digital_write(disp.DC_PIN, False)
+    return bool(high) and not disp.DC_PIN.value
+
+
+@contextlib.contextmanager
+def display(label):
+    driver = lib.driver("1inch14")
+    if label == "gpiozero (mock)":
+        disp = sim.make_display(driver)
+    elif label == "sim":
+        disp = sim.make_display(driver, gpio = "sim")
+    else:
+        disp = driver(spi = None, gpio = label)
+    try:
+        yield disp
+    finally:
+        if label in ("gpiozero (mock)", "sim"):
+            sim.close_display(disp)
+        else:
+            disp.module_exit()
+
+
+def main(toggles = 200000):
+    on_pi = os.path.exists("/dev/gpiomem") or os.path.exists("/dev/gpiochip0")
+    labels = ["gpiozero (mock)", "sim"]
+    if on_pi:
+        labels = ["gpiozero", "lgpio", "gpiomem"] + labels[1:]
+    rates = {}
+    for label in labels:
+        try:
+            with display(label) as disp:
+                assert check(disp), label
+                rates[label] = toggles_per_s(disp, toggles)
+        except (ImportError, OSError) as e:
+            print("{:16s} skipped: {}".format(label, e))
+            continue
+        print("{:16s} {:12,.0f} toggles/s  {:8.3f} us/toggle".format(label, rates[label], 1e6 / rates[label]))
+    base = rates.get("gpiozero", rates.get("gpiozero (mock)"))
+    for label, rate in rates.items():
+        if not label.startswith("gpiozero"):
+            print("{:16s} {:6.1f}x gpiozero".format(label, rate / base))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,122 @@
+"""Panel init and per-frame window setup: byte-at-a-time vs the command stream.
+
+    python -m benchmarks.bench_lcd_commands [frames]
+
+Every driver runs on a RecordingSpi twice: once with run_sequence and
+set_window replaced by the old pattern (DC written and one SPI transfer
+per byte, CASET/RASET every frame) and once as is. Init sleeps are not
+taken but summed separately, since they are the same for both. Reported
+per driver: SPI transactions and DC writes, and host time for Init and for
+one frame's SetWindows plus the DC write before the pixels, both for
+full-screen frames (same window every time) and for dirty rectangles (a
+new window every time). On the Pi every transaction is an ioctl and
+every DC write a GPIO call, so the counts are what carries over to the
+hardware.
+"""
+import sys
+import time
+
+import lib
+from lib import sim
+
+
+def legacy_send(disp, cmd, params = ()):
+    disp.digital_write(disp.DC_PIN, False)
+    disp.spi_writebyte([cmd])
+    for val in params:
+        disp.digital_write(disp.DC_PIN, True)
+        disp.spi_writebyte([val])
+
+
+def legacy_sequence(disp, sequence):
+    for cmd, params, delay in sequence:
+        legacy_send(disp, cmd, params)
+        if delay:
+            disp.delay_ms(delay)
+
+
+def legacy_window(disp, caset, raset):
+    legacy_send(disp, 0x2A, caset)
+    legacy_send(disp, 0x2B, raset)
+    legacy_send(disp, 0x2C)
+
+
+class Counter:
+    """Counts DC writes of one display and the time it asked to sleep"""
+
+    def __init__(self, disp):
+        self.dc_writes = 0
+        self.slept = 0.0
+        write = disp.digital_write
+
+        def digital_write(Pin, value):
+            if Pin is disp.DC_PIN:
+                self.dc_writes += 1
+            write(Pin, value)
+
+        disp.digital_write = digital_write
+
+    def sleep(self, seconds):
+        self.slept += seconds
+
+
+def boxes(disp, frames):
+    """Dirty rectangles that move every frame"""
+    w, h = disp.width, disp.height
+    for i in range(frames):
+        x, y = (i * 7) % (w // 2), (i * 5) % (h // 2)
+        yield x, y, x + w // 4, y + h // 4
+
+
+def measure(name, frames, legacy):
+    disp = sim.make_display(lib.driver(name))
+    if legacy:
+        disp.run_sequence = lambda sequence: legacy_sequence(disp, sequence)
+        disp.set_window = lambda caset, raset: legacy_window(disp, caset, raset)
+    count = Counter(disp)
+    spi = disp.SPI
+    result = {}
+    real_sleep = time.sleep
+    time.sleep = count.sleep
+    try:
+        start = time.perf_counter()
+        disp.Init()
+        result["init_ms"] = (time.perf_counter() - start) * 1000.0
+    finally:
+        time.sleep = real_sleep
+    result["init_sleep_ms"] = count.slept * 1000.0
+    result["init_tx"] = spi.transactions
+    result["init_dc"] = count.dc_writes
+
+    for label, windows in (("full", [(0, 0, disp.width, disp.height)] * frames),
+                           ("dirty", list(boxes(disp, frames)))):
+        spi.transactions = 0
+        count.dc_writes = 0
+        start = time.perf_counter()
+        for box in windows:
+            disp.SetWindows(*box)
+            disp.digital_write(disp.DC_PIN, True)
+        result[label + "_us"] = (time.perf_counter() - start) / frames * 1e6
+        result[label + "_tx"] = spi.transactions / frames
+        result[label + "_dc"] = count.dc_writes / frames
+    sim.close_display(disp)
+    return result
+
+
+def main(frames = 500):
+    print("{:12s} {:>6s} | {:>22s} | {:>26s} | {:>26s}".format(
+        "", "", "Init tx / DC / ms", "full frame tx / DC / us", "dirty rect tx / DC / us"))
+    for name in lib.DRIVERS:
+        for legacy in (True, False):
+            r = measure(name, frames, legacy)
+            print("LCD_{:8s} {:>6s} | {:5d} {:5d} {:7.2f} ms | {:6.1f} {:6.1f} {:8.1f} us | {:6.1f} {:6.1f} {:8.1f} us".format(
+                name, "old" if legacy else "stream",
+                r["init_tx"], r["init_dc"], r["init_ms"],
+                r["full_tx"], r["full_dc"], r["full_us"],
+                r["dirty_tx"], r["dirty_dc"], r["dirty_us"]))
+    print("(not included: Init sleeps, the same either way, e.g. {:.0f} ms for LCD_{})".format(
+        r["init_sleep_ms"], name))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
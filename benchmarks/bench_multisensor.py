@@ -0,0 +1,49 @@
+"""Aggregate sample rate of lib.sensors.SensorManager with 1..8 simulated AS7331.
+
+    python -m benchmarks.bench_multisensor [seconds] [byte_us]
+
+Sensors sit at 0x74..0x77 on one or two SimSMBus buses; byte_us models the
+bus speed (default 90 us per byte, 100 kHz). All sensors see the same light
+and settle at the same range, so the per-sensor rate is bounded by the
+integration time and the aggregate should grow with the sensor count.
+"""
+import sys
+import time
+
+from lib import sensors, sim
+
+LAYOUTS = [
+    ("1 sensor", [(1, 0x74)]),
+    ("2 sensors, 1 bus", [(1, 0x74), (1, 0x75)]),
+    ("4 sensors, 1 bus", [(1, 0x74), (1, 0x75), (1, 0x76), (1, 0x77)]),
+    ("8 sensors, 2 buses", [(b, a) for b in (1, 3) for a in (0x74, 0x75, 0x76, 0x77)]),
+]
+
+
+def run(layout, seconds, byte_us):
+    buses = {}
+    for bus_id, addr in layout:
+        bus = buses.setdefault(bus_id, sim.SimSMBus(byte_us = byte_us))
+        bus.devices[addr] = sim.SimAS7331(light = (0.4, 0.1, 0.02))
+    manager = sensors.SensorManager(buses)
+    for bus_id, addr in layout:
+        manager.add(bus_id, addr)
+    manager.start()
+    time.sleep(seconds)
+    manager.stop()
+    return manager
+
+
+def main(seconds = 3.0, byte_us = 90.0):
+    print("{:<20} | {:>10} | {:>12} | {}".format("layout", "total /s", "per sensor", "range"))
+    for name, layout in LAYOUTS:
+        manager = run(layout, seconds, byte_us)
+        rates = manager.throughput()
+        s = manager.sensors[0]
+        per = [rates[x.name] for x in manager.sensors]
+        print("{:<20} | {:>10.1f} | {:>5.1f}..{:<5.1f} | {}x {} ms".format(
+            name, rates["total"], min(per), max(per), s.gain, s.time_ms))
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0, float(sys.argv[2]) if len(sys.argv) > 2 else 90.0)
@@ -0,0 +1,78 @@
+"""Palette ("P") canvases against RGB canvases: memory and per-frame cost.
+
+    python -m benchmarks.bench_palette [frames]
+
+For every panel size a frame like czujkaUV's measurement screen (black
+background, three lines of text in three colours) is drawn into a pooled
+canvas of each mode and encoded with FramePool.encode: the shifts and
+masks of rgb888_to_rgb565 for "RGB", one gather through the palette's
+RGB565 table for "P". Reported: canvas bytes, ms for the whole frame and
+for the encode alone, and the peak allocation of one encode. Both modes
+must give the same RGB565 for the same pixels (checked on a frame drawn
+without anti-aliasing).
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import ImageFont
+
+from lib import lcdconfig, textlayout
+from lib.framepool import FramePool
+
+from .bench_rgb565 import RESOLUTIONS
+
+LINES = [("POMIAR UV", "WHITE"), ("UVA:  12.34 uW/cm2", "CYAN"), ("UVB:   1.23 uW/cm2", "YELLOW")]
+
+
+def draw(pool, text, mode, i):
+    image = pool.canvas(mode, "BLACK", mode = mode)
+    for n, (line, fill) in enumerate(LINES):
+        if n:
+            line = line.replace("12.34", "{:5.2f}".format(i % 100 + 0.01 * n))
+        text.text(image, (4, 4 + 24 * n), line, fill)
+    return image
+
+
+def per_frame_ms(func, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        func(i)
+    return (time.perf_counter() - start) / frames * 1000.0
+
+
+def peak_kib(func):
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024.0
+    finally:
+        tracemalloc.stop()
+
+
+def main(frames = 200):
+    text = textlayout.TextLayout(ImageFont.load_default(20))
+    print("{:>9} {:>4} | {:>9} | {:>9} | {:>9} | {:>10}".format(
+        "size", "mode", "canvas B", "frame ms", "encode ms", "encode KiB"))
+    for width, height in RESOLUTIONS:
+        pool = FramePool(width, height)
+        for mode in ("RGB", "P"):
+            image = draw(pool, text, mode, 0)
+            frame = per_frame_ms(lambda i: pool.encode(draw(pool, text, mode, i)), frames)
+            encode = per_frame_ms(lambda i: pool.encode(image), frames)
+            peak = peak_kib(lambda: pool.encode(image))
+            canvas = width * height * len(image.getbands())
+            print("{:>9} {:>4} | {:>9} | {:>9.3f} | {:>9.3f} | {:>10.1f}".format(
+                "{}x{}".format(width, height), mode, canvas, frame, encode, peak))
+
+        image = draw(pool, text, "P", 0)
+        if not np.array_equal(pool.encode(image), lcdconfig.rgb888_to_rgb565(image.convert("RGB"))):
+            print("palette encode differs from RGB for {}x{}".format(width, height))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:]]))
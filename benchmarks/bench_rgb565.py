@@ -0,0 +1,73 @@
+"""Per-frame cost of the RGB888 -> RGB565 -> SPI path, before and after.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rgb565 [frames]
+
+"before" is the list based conversion every LCD_* driver used to carry,
+"after" is lcdconfig.rgb888_to_rgb565 + RaspberryPi.spi_writebuffer. SPI
+writes go to a sink that only counts bytes, so the numbers are pure CPU.
+"""
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from lib import lcdconfig
+
+RESOLUTIONS = [(160, 80), (240, 135), (160, 128), (240, 240), (240, 280), (172, 320), (170, 320), (240, 320)]
+
+
+class CountingSpi:
+    def __init__(self):
+        self.bytes = 0
+
+    def writebytes(self, data):
+        self.bytes += len(data)
+
+    def writebytes2(self, data):
+        self.bytes += len(data)
+
+
+def legacy_frame(image, spi):
+    img = np.asarray(image)
+    pix = np.zeros((image.height, image.width, 2), dtype = np.uint8)
+    pix[...,[0]] = np.add(np.bitwise_and(img[...,[0]],0xF8),np.right_shift(img[...,[1]],5))
+    pix[...,[1]] = np.add(np.bitwise_and(np.left_shift(img[...,[1]],3),0xE0),np.right_shift(img[...,[2]],3))
+    pix = pix.flatten().tolist()
+    for i in range(0,len(pix),4096):
+        spi.writebytes(pix[i:i+4096])
+
+
+def packed_frame(image, spi):
+    pix = lcdconfig.rgb888_to_rgb565(image)
+    data = memoryview(np.frombuffer(pix, dtype = np.uint8))
+    spi.writebytes2(data)
+
+
+def bench(func, image, frames):
+    spi = CountingSpi()
+    func(image, spi)
+    spi.bytes = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        func(image, spi)
+    elapsed = time.perf_counter() - start
+    return elapsed / frames * 1000.0, spi.bytes // frames
+
+
+def main(frames = 50):
+    rng = np.random.default_rng(0)
+    print("{:>9} | {:>10} | {:>10} | {:>7} | {}".format("size", "before ms", "after ms", "speedup", "bytes/frame"))
+    for width, height in RESOLUTIONS:
+        image = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype = np.uint8), "RGB")
+        before, nbytes_before = bench(legacy_frame, image, frames)
+        after, nbytes_after = bench(packed_frame, image, frames)
+        assert nbytes_before == nbytes_after
+        print("{:>9} | {:>10.3f} | {:>10.3f} | {:>6.1f}x | {}".format(
+            "{}x{}".format(width, height), before, after, before / after, nbytes_after))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
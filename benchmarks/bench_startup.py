@@ -0,0 +1,83 @@
+"""Startup cost: import time of czujkaUV and time to the first sample and frame.
+
+    python -m benchmarks.bench_startup [runs]
+
+Import cost comes from `python -X importtime -c "import czujkaUV"` in a fresh
+interpreter; the heaviest modules are listed and the hardware/number
+crunching packages (numpy, spidev, gpiozero, smbus2) are flagged if the
+import pulls them in. Time to first sample / first frame is measured from
+process start with CZUJKAUV_SIM=1, following the order run() uses: bus and
+sensor first, display while the first conversion integrates.
+"""
+import os
+import subprocess
+import sys
+import time
+
+HEAVY = ("numpy", "spidev", "gpiozero", "smbus2", "PIL.Image")
+
+FIRST_FRAME = """
+import time
+import czujkaUV as c
+c.open_bus()
+c.init_sensor()
+c.start_continuous(c.sensor.time_code)
+sample = c.smart_measure_auto()
+print("@sample", time.time())
+c.open_display()
+c.lcd_display(*sample)
+print("@frame", time.time())
+"""
+
+
+def importtime():
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import czujkaUV"],
+                         capture_output = True, text = True, check = True).stderr
+    modules = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line.split(":", 1)[1].split("|")
+        # two spaces of indent per level: 3 = imported directly by czujkaUV
+        top = len(name) - len(name.lstrip()) == 3
+        modules[name.strip()] = (int(cumulative), top)
+    return modules
+
+
+def first_frame():
+    env = dict(os.environ, CZUJKAUV_SIM = "1")
+    start = time.time()
+    out = subprocess.run([sys.executable, "-c", FIRST_FRAME], env = env,
+                         capture_output = True, text = True, check = True).stdout
+    marks = {}
+    for line in out.splitlines():
+        if line.startswith("@"):
+            name, stamp = line[1:].split()
+            marks[name] = (float(stamp) - start) * 1000.0
+    return marks
+
+
+def main(runs = 5):
+    modules = importtime()
+    total = modules["czujkaUV"][0] / 1000.0
+    print("import czujkaUV: {:.1f} ms".format(total))
+    top = sorted(((cum, name) for name, (cum, top) in modules.items() if top),
+                 reverse = True)[:8]
+    for cum, name in top:
+        print("    {:<28} {:8.1f} ms".format(name, cum / 1000.0))
+    for name in HEAVY:
+        print("    {:<28} {}".format(name, "imported" if name in modules else "not imported"))
+
+    samples, frames = [], []
+    for _ in range(runs):
+        marks = first_frame()
+        samples.append(marks["sample"])
+        frames.append(marks["frame"])
+    samples.sort()
+    frames.sort()
+    print("first sample: {:.0f} ms  first frame: {:.0f} ms  (median of {}, from process start)".format(
+        samples[len(samples) // 2], frames[len(frames) // 2], runs))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
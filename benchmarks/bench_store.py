@@ -0,0 +1,50 @@
+"""Append and query cost of lib.uvstore.
+
+    python -m benchmarks.bench_store [records] [directory]
+
+Appends records with a write+fsync per sample (flush_records=1) and with
+the batched default, then times a range query over 1% of the data. The
+directory defaults to a temporary one; pass a path on the SD card to see
+the real fsync cost on the Pi.
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from lib import uvstore
+
+
+def fill(directory, records, flush_records):
+    store = uvstore.UVStore(directory, segment_bytes = 256 << 10, flush_records = flush_records)
+    t0 = 1.7e9
+    start = time.perf_counter()
+    for i in range(records):
+        store.append(t0 + i * 0.5, 64, 64, i & 0xFFFF, 2000, 300, 1700.0, 380.0, 0x08)
+    store.close()
+    elapsed = time.perf_counter() - start
+    return elapsed / records * 1e6, store.writes, store.fsyncs
+
+
+def main(records = 20000, directory = None):
+    root = directory or tempfile.mkdtemp(prefix = "uvstore-")
+    try:
+        for flush_records in (1, 256):
+            path = "{}/batch{}".format(root, flush_records)
+            us, writes, fsyncs = fill(path, records, flush_records)
+            print("flush_records={:<4} {:8.1f} us/append  {:6d} writes  {:6d} fsyncs  {} segments".format(
+                flush_records, us, writes, fsyncs, len(uvstore.list_segments(path))))
+
+        t0 = 1.7e9 + records * 0.5 * 0.45
+        uvstore.query(path, 0, 1)    # numpy import, not part of the query
+        start = time.perf_counter()
+        rows = uvstore.query(path, t0, t0 + records * 0.5 * 0.01)
+        print("query 1% of {} records: {} rows in {:.2f} ms".format(
+            records, len(rows), (time.perf_counter() - start) * 1000.0))
+    finally:
+        if directory is None:
+            shutil.rmtree(root, ignore_errors = True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,82 @@
+"""Check the hysteresis of autorange.AutoRange.
+
+    python -m benchmarks.check_autorange
+
+The "flicker" scenario of replay_ranging (light jumping 12x back and forth)
+must move the range at most once per level, mild readings alternating
+around the band must never move it, and a mild reading must move it only
+when it repeats on the same side, while clipping or a count near zero
+re-ranges at once. The first reading after a range change is not held:
+a mild one re-ranges in the same call. Exits non-zero on failure.
+"""
+import sys
+
+from lib import autorange
+
+from . import replay_ranging as replay
+
+FLICKER = dict(replay.SCENARIOS)["flicker"] * 3
+
+
+def counting_ranger():
+    ranger = autorange.AutoRange(replay.GAIN_LEVELS, replay.TIMES_MS)
+    ranger.steps = 0
+    update = ranger.update
+
+    def counted(*args):
+        new = update(*args)
+        if new is not None:
+            ranger.steps += 1
+        return new
+
+    ranger.update = counted
+    return ranger
+
+
+def main():
+    checks = []
+
+    ranger = counting_ranger()
+    state = (0, len(replay.TIMES_MS) - 1)
+    # the first level starts from the default range, not from a flicker
+    state = replay.converge(lambda lv, st: replay.predictive_cycle(lv, st, ranger), FLICKER[0], state)[0]
+    for level in FLICKER[1:]:
+        before = ranger.steps
+        state = replay.converge(lambda lv, st: replay.predictive_cycle(lv, st, ranger), level, state)[0]
+        steps = ranger.steps - before
+        checks.append((steps <= 1, "flicker to {}: {} range steps, expected at most 1".format(level, steps)))
+
+    g, t = 5, 6
+    ranger = counting_ranger()
+    # an in-band reading ends the settling after the default range
+    ranger.update(autorange.RAW_TARGET, False, g, t)
+    for raw in [autorange.RAW_TARGET_MIN - 100, autorange.RAW_TARGET_MAX + 2000] * 10:
+        ranger.update(raw, False, g, t)
+    checks.append((ranger.steps == 0, "alternating mild readings moved the range {} times".format(ranger.steps)))
+
+    ranger = autorange.AutoRange(replay.GAIN_LEVELS, replay.TIMES_MS)
+    low = autorange.RAW_TARGET_MIN - 100
+    ranger.update(autorange.RAW_TARGET, False, g, t)
+    first, second = ranger.update(low, False, g, t), ranger.update(low, False, g, t)
+    checks.append((first is None and second is not None,
+                   "repeated mild reading: {}, {}; expected None, then a range".format(first, second)))
+
+    ranger = autorange.AutoRange(replay.GAIN_LEVELS, replay.TIMES_MS)
+    new = ranger.update(65535, True, g, t)
+    after = ranger.update(low, False, *new) if new else None
+    checks.append((after is not None, "mild reading after a range change was held: {}".format(after)))
+
+    for raw, saturated in [(65535, True), (autorange.RAW_HARD_LOW - 1, False)]:
+        ranger = autorange.AutoRange(replay.GAIN_LEVELS, replay.TIMES_MS)
+        checks.append((ranger.update(raw, saturated, g, t) is not None,
+                       "hard reading {} did not re-range at once".format(raw)))
+
+    failed = [msg for ok, msg in checks if not ok]
+    for msg in failed:
+        print("FAIL: " + msg)
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
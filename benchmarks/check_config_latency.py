@@ -0,0 +1,90 @@
+"""Check the AS7331 configuration path on a simulated bus with real I2C timing.
+
+    python -m benchmarks.check_config_latency [byte_us]
+
+Each auto-range step used to be set_conf: OSR=CONFIG, sleep 5 ms, CREG1,
+sleep 5 ms, then OSR_START. With as7331.AS7331 a range change is one
+transaction (OSR + changed registers) followed by OSR_START, and an
+unchanged range sends nothing. A full configuration bridges CREG2 and
+goes out as one block write. The bus models byte_us per byte (default
+90 us, 100 kHz). Exits non-zero if the limits below are not met.
+"""
+import sys
+import time
+
+from lib import as7331, sim
+
+STEPS = [(3, 6), (7, 6), (7, 4), (11, 2), (0, 6), (5, 5)]
+
+# limits per range step at 100 kHz: a few bytes of I2C, no sleeps
+MAX_CHANGE_MS = 2.0
+MAX_SAME_MS = 0.05
+
+
+def legacy_step(bus, addr, gain_index, time_code):
+    bus.write_byte_data(addr, as7331.OSR, 0x02)
+    time.sleep(0.005)
+    bus.write_byte_data(addr, as7331.CREG1, ((11 - gain_index) << 4) | time_code)
+    time.sleep(0.005)
+    bus.write_byte_data(addr, as7331.OSR, as7331.OSR_START)
+
+
+def shadow_step(chip, gain_index, time_code):
+    if chip.configure(gain_index = gain_index, time_code = time_code) or not chip.measuring:
+        chip.start()
+
+
+def timed(steps, func):
+    start = time.perf_counter()
+    for step in steps:
+        func(*step)
+    return (time.perf_counter() - start) / len(steps) * 1000.0
+
+
+def main(byte_us = 90.0):
+    device = sim.SimAS7331()
+    bus = sim.SimSMBus({as7331.ADDR: device}, byte_us = byte_us)
+    chip = as7331.AS7331(bus)
+    chip.reset()
+    chip.configure(mmode = as7331.MMODE_CONT)
+    chip.start()
+
+    legacy = timed(STEPS, lambda g, t: legacy_step(bus, as7331.ADDR, g, t))
+
+    bus.transactions = bus.bytes = 0
+    change = timed(STEPS, lambda g, t: shadow_step(chip, g, t))
+    change_tx, change_bytes = bus.transactions, bus.bytes
+
+    bus.transactions = bus.bytes = 0
+    same = timed([STEPS[-1]] * len(STEPS), lambda g, t: shadow_step(chip, g, t))
+    same_tx = bus.transactions
+
+    fresh = as7331.AS7331(bus)
+    blocks = fresh._block_writes({as7331.CREG1: fresh.creg1(), as7331.CREG3: fresh.mmode, as7331.BREAK: 0})
+
+    creg1 = device.config[as7331.CREG1]
+    expected = ((11 - STEPS[-1][0]) << 4) | STEPS[-1][1]
+
+    print("legacy set_conf + start  {:7.3f} ms/step".format(legacy))
+    print("shadowed, range changed  {:7.3f} ms/step  {:.1f} transactions, {:.1f} bytes".format(
+        change, change_tx / len(STEPS), change_bytes / len(STEPS)))
+    print("shadowed, range same     {:7.3f} ms/step  {} transactions".format(same, same_tx))
+
+    ok = True
+    for cond, msg in [
+        (change <= MAX_CHANGE_MS, "range change took {:.3f} ms > {} ms".format(change, MAX_CHANGE_MS)),
+        (same <= MAX_SAME_MS, "unchanged range took {:.3f} ms > {} ms".format(same, MAX_SAME_MS)),
+        (same_tx == 0, "unchanged range used the bus"),
+        (creg1 == expected, "CREG1 is 0x{:02X}, expected 0x{:02X}".format(creg1, expected)),
+        (device.mmode == as7331.MMODE_CONT, "measuring mode lost"),
+        (len(blocks) == 1, "CREG1..BREAK took {} block writes, expected 1".format(len(blocks))),
+    ]:
+        if not cond:
+            print("FAIL: " + msg)
+            ok = False
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 90.0))
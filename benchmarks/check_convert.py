@@ -0,0 +1,56 @@
+"""Check uvconvert.Converter.batch against the scalar path.
+
+    python -m benchmarks.check_convert
+
+Arrays and plain scalars must convert to the same values as
+Converter.scalar at the same gain and time, and register codes outside
+the table (gain 12-15, time above 15) must raise ValueError.
+Exits non-zero on failure.
+"""
+import sys
+
+import numpy as np
+
+from lib import uvconvert
+
+
+def main():
+    conv = uvconvert.Converter()
+    checks = []
+
+    gain_codes = np.arange(uvconvert.GAIN_CODES).repeat(uvconvert.TIME_CODES)
+    time_codes = np.tile(np.arange(uvconvert.TIME_CODES), uvconvert.GAIN_CODES)
+    raw = np.full(gain_codes.shape, 1000, dtype = np.uint16)
+    uva, uvb, _ = conv.batch(raw, raw, raw, gain_codes, time_codes)
+    expected = np.array([conv.scalar(1000, 1000, uvconvert.gain_of_code(g), uvconvert.time_ms_of_code(t))
+                         for g, t in zip(gain_codes, time_codes)])
+    checks.append((np.allclose(uva, expected[:, 0]) and np.allclose(uvb, expected[:, 1]),
+                   "batch over every code pair differs from scalar()"))
+
+    try:
+        uva, uvb, uvc, temp_c = conv.batch(100, 50, 10, 11, 6, temp = 2000)
+        ok = np.allclose((uva, uvb), conv.scalar(100, 50, 1, 64)) and np.ndim(uva) == 0
+        msg = "scalar input gave {}, expected {}".format((uva, uvb), conv.scalar(100, 50, 1, 64))
+    except (TypeError, ValueError) as e:
+        ok, msg = False, "scalar input raised {!r}".format(e)
+    checks.append((ok, msg))
+
+    for gain_code, time_code in [(12, 6), (15, 0), (0, 16), (-1, 6)]:
+        try:
+            conv.batch([1], [1], [1], [gain_code], [time_code])
+            ok, msg = False, "codes ({}, {}) accepted".format(gain_code, time_code)
+        except ValueError:
+            ok, msg = True, ""
+        except IndexError as e:
+            ok, msg = False, "codes ({}, {}) raised {!r}".format(gain_code, time_code, e)
+        checks.append((ok, msg))
+
+    failed = [msg for ok, msg in checks if not ok]
+    for msg in failed:
+        print("FAIL: " + msg)
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
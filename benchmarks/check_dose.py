@@ -0,0 +1,67 @@
+"""Check uvdose.DoseEngine on synthetic sample streams.
+
+    python -m benchmarks.check_dose
+
+Constant irradiance for a known time must integrate to the expected
+dose, a dose limit must raise its alarm once, and limits over windows
+that are not in `windows` must be tracked instead of breaking feed().
+Exits non-zero on failure.
+"""
+import sys
+
+from lib import uvdose
+
+
+def constant(engine, uva, uvb, seconds, step = 1.0, time_ms = 64):
+    """Feed a constant irradiance every step seconds; returns the raised limits"""
+    raised = []
+    t = 0.0
+    while t <= seconds:
+        raised += engine.feed(t, uva, uvb, time_ms)
+        t += step
+    return raised
+
+
+def main():
+    checks = []
+
+    # 100 uW/cm2 of UVA for 600 s = 600 J/m2 (plus the first sample's 64 ms)
+    engine = uvdose.DoseEngine()
+    constant(engine, 100.0, 0.0, 600)
+    expected = 100.0 * (600 + 0.064) * uvdose.UW_CM2_S_TO_J_M2
+    checks.append((abs(engine.dose("uva") - expected) < 1e-6,
+                   "total UVA {:.4f} J/m2, expected {:.4f}".format(engine.dose("uva"), expected)))
+    checks.append((abs(engine.dose("uva", 15 * 60) - expected) < 1e-6,
+                   "15 min UVA {:.4f} J/m2, expected {:.4f}".format(engine.dose("uva", 15 * 60), expected)))
+
+    # the limit is crossed once and stays raised
+    engine = uvdose.DoseEngine(limits = {("uvb", 60): 1.0})
+    raised = constant(engine, 0.0, 10.0, 30)
+    checks.append((raised == [("uvb", 60)], "UVB limit raised {}, expected once".format(raised)))
+
+    # limits over 8 h while only 60 s is listed in windows
+    try:
+        engine = uvdose.DoseEngine(windows = (60,))
+        constant(engine, 1.0, 1.0, 10)
+        ok = engine.dose("ery", 8 * 3600) > 0.0
+        msg = "8 h erythemal dose not accumulated"
+    except (KeyError, ValueError) as e:
+        ok, msg = False, "limit window missing from windows: {!r}".format(e)
+    checks.append((ok, msg))
+
+    try:
+        uvdose.DoseEngine(limits = {("uvc", 60): 1.0})
+        ok = False
+    except ValueError:
+        ok = True
+    checks.append((ok, "unknown channel in limits accepted"))
+
+    failed = [msg for ok, msg in checks if not ok]
+    for msg in failed:
+        print("FAIL: " + msg)
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
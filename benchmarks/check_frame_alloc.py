@@ -0,0 +1,120 @@
+"""Check that the steady-state display loop does not grow memory per frame.
+
+    python -m benchmarks.check_frame_alloc [frames]
+
+Runs czujkaUV.lcd_display on the simulated display (measurement screen and
+alarm screen) and ShowImage of every LCD driver, with the "sim" GPIO
+backend (gpiozero's mock pins keep a history of every state change).
+After a warm-up that fills the pools and text caches, tracemalloc
+compares the traced memory (after a gc pass) before and after `frames`
+more frames; the growth must stay under MAX_GROWTH_B in total, i.e.
+nothing is kept per frame. The peak above the starting level of one
+frame is reported as well. Exits non-zero on failure and prints the
+biggest growing allocation sites.
+"""
+import gc
+import importlib
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+import lib
+from lib import sim
+
+WARMUP = 300
+# free lists and PIL internals wobble by a few KiB whatever the frame count;
+# one small object kept per frame is already 50+ B * frames
+MAX_GROWTH_B = 8192
+
+
+def measure(step, frames):
+    """(growth in bytes over frames, peak KiB of one frame, top growing sites)
+
+    Tracing starts with `frames` frames that only absorb one-time buffers
+    (e.g. the first write to the output sink); growth is counted over the
+    `frames` after them.
+    """
+    for i in range(WARMUP):
+        step(i)
+    tracemalloc.start(5)
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        step(WARMUP)
+        peak = (tracemalloc.get_traced_memory()[1] - start) / 1024.0
+        for i in range(frames):
+            step(WARMUP + 1 + i)
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        start = tracemalloc.get_traced_memory()[0]
+        for i in range(frames):
+            step(WARMUP + 1 + frames + i)
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - start
+        top = tracemalloc.take_snapshot().compare_to(before, "traceback")[:3]
+    finally:
+        tracemalloc.stop()
+    return growth, peak, top
+
+
+def czujka_steps():
+    os.environ["CZUJKAUV_SIM"] = "1"
+    os.environ["CZUJKAUV_GPIO"] = "sim"
+    czujka = importlib.import_module("czujkaUV")
+    czujka.open_bus()
+    czujka.open_display()
+    conv = czujka.converter
+    gain, time_ms = 2048, 64
+    # raw counts for an irradiance in uW/cm2 at this range
+    fa, fb, _ = conv.factors(gain, time_ms)
+
+    def pomiar(i):
+        uva = 10.0 + (i % 97) * 0.37
+        czujka.lcd_display(int(uva / fa), int(uva / 10 / fb), gain, time_ms)
+
+    def alarm(i):
+        uvb = czujka.UVB_ALARM_TSH + 1.0 + (i % 89) * 1.3
+        czujka.lcd_display(0, int(uvb / fb), gain, time_ms)
+
+    yield "czujkaUV measurement screen", pomiar
+    yield "czujkaUV alarm screen", alarm
+    sim.close_display(czujka.disp)
+
+
+def driver_steps():
+    for name in lib.DRIVERS:
+        disp = sim.make_display(lib.driver(name), gpio = "sim")
+        disp.Init()
+        rng = np.random.default_rng(0)
+        images = [Image.fromarray(rng.integers(0, 256, (disp.height, disp.width, 3), dtype = np.uint8), "RGB")
+                  for _ in range(3)]
+
+        def show(i):
+            disp.ShowImage(images[i % len(images)])
+
+        yield "LCD_" + name + " ShowImage", show
+        sim.close_display(disp)
+
+
+def main(frames = 500):
+    failed = False
+    for steps in (czujka_steps(), driver_steps()):
+        for label, step in steps:
+            growth, peak, top = measure(step, frames)
+            ok = growth <= MAX_GROWTH_B
+            failed |= not ok
+            print("{:30s} growth {:7d} B / {} frames  peak {:7.1f} KiB/frame  {}".format(
+                label, growth, frames, peak, "ok" if ok else "FAIL"))
+            if not ok:
+                for stat in top:
+                    print("    ", stat)
+                    for line in stat.traceback.format()[-4:]:
+                        print("        ", line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:]]))
@@ -0,0 +1,87 @@
+"""Check hardware rotation through MADCTL on every LCD driver.
+
+    python -m benchmarks.check_orientation
+
+Each driver is turned through 0, 90, 180, 270 and back to 0 on a
+RecordingSpi. For every orientation the frame must land in a window of
+exactly width x height inside the panel's GRAM (with MV swapping the
+GRAM axes), 0x36 must be sent once per change and never again while the
+orientation stays, and an image of the swapped size must turn the panel
+instead of being rejected; a FrameDiff on the display must then send its
+next frame in full. Exits non-zero on failure.
+"""
+import sys
+
+from PIL import Image
+
+import lib
+from lib import framediff, lcdconfig, sim
+
+SWEEP = (0, 90, 180, 270, 0)
+
+
+def frame(disp):
+    return Image.new("RGB", (disp.width, disp.height), "RED")
+
+
+def check_driver(name):
+    """(one line per orientation, list of failures)"""
+    disp = sim.make_display(lib.driver(name))
+    spi = disp.SPI
+    lines, errors = [], []
+    try:
+        disp.Init()
+        previous = disp.orientation
+        for orientation in SWEEP:
+            sent = spi.commands[0x36]
+            disp.set_orientation(orientation)
+            disp.ShowImage(frame(disp))
+            disp.ShowImage(frame(disp))
+            x0, y0, x1, y1 = spi.window
+            gw, gh = disp.GRAM
+            if disp.madctl & lcdconfig.MADCTL_MV:
+                gw, gh = gh, gw
+            lines.append("{:3d}: 36 {:02X} window {}".format(orientation, disp.madctl, (x0, y0, x1, y1)))
+            if (x1 - x0 + 1, y1 - y0 + 1) != (disp.width, disp.height) or x1 >= gw or y1 >= gh:
+                errors.append("{}: window {} does not fit {}x{} in GRAM {}x{}".format(
+                    orientation, (x0, y0, x1, y1), disp.width, disp.height, gw, gh))
+            expected = 0 if orientation == previous else 1
+            if spi.commands[0x36] - sent != expected:
+                errors.append("{}: 0x36 sent {} times, expected {}".format(
+                    orientation, spi.commands[0x36] - sent, expected))
+            previous = orientation
+
+        disp.set_orientation(0)
+        screen = framediff.FrameDiff(disp)
+        screen.show(frame(disp))
+        portrait = (disp.width, disp.height)
+        disp.ShowImage(Image.new("RGB", portrait[::-1], "BLUE"))
+        if disp.orientation != 90 and portrait[0] != portrait[1]:
+            errors.append("swapped-size image left the panel at {}".format(disp.orientation))
+        # the panel turned under the FrameDiff: its copy is stale
+        boxes = screen.show(frame(disp))
+        if portrait[0] != portrait[1] and boxes != [(0, 0, disp.width, disp.height)]:
+            errors.append("FrameDiff after the turn sent {}, expected the full frame".format(boxes))
+    except ValueError as e:
+        errors.append(str(e))
+    finally:
+        sim.close_display(disp)
+    return lines, errors
+
+
+def main():
+    failed = False
+    for name in lib.DRIVERS:
+        lines, errors = check_driver(name)
+        print("LCD_" + name)
+        for line in lines:
+            print("    " + line)
+        for error in errors:
+            print("    FAIL: " + error)
+        failed |= bool(errors)
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Replay light steps through the auto-ranging and count conversions to converge.
+
+    python -m benchmarks.replay_ranging [levels.csv]
+
+A light level is the raw count the AS7331 would give at gain 1x and 1 ms;
+counts scale with gain x time and clip at 65535 with ADCOF set. Without an
+argument a built-in set of steps is replayed (lamp on/off, sun, dusk). A
+CSV file gives one level per sample and is replayed as-is.
+
+"steps" is the legacy one-notch-per-conversion ranging from smart_measure_auto,
+"predictive" is lib.autorange.AutoRange. For every change of light the
+number of conversions and the integration + config time until a reading
+lands in [RAW_TARGET_MIN, RAW_TARGET_MAX] (or the range hits its limit) is
+reported. Exits non-zero if the predictive ranging needs more than
+MAX_PREDICTIVE conversions for any step after the first level.
+"""
+import sys
+
+from lib import autorange
+from lib.as7331 import GAIN_LEVELS, TIME_STEPS
+
+TIMES_MS = [1 << code for code in TIME_STEPS]
+CONF_MS = 10            # set_conf: two writes with 5 ms sleeps each
+MAX_CONVERSIONS = 12    # per smart_measure_auto call in the old code
+MAX_PREDICTIVE = 2      # conversions per light step for AutoRange
+
+SCENARIOS = [
+    ("dark -> lamp on", [0.01, 300.0]),
+    ("lamp on -> off", [300.0, 0.01]),
+    ("room -> sun", [0.5, 40.0]),
+    ("sun -> shade", [40.0, 2.0]),
+    ("dusk -> dark", [0.2, 0.002]),
+    ("flicker", [5.0, 60.0, 5.0, 60.0]),
+]
+
+
+def read(level, gain_index, time_idx):
+    counts = level * GAIN_LEVELS[gain_index] * TIMES_MS[time_idx]
+    return int(min(counts, 65535)), counts > 65535
+
+
+def in_band(raw):
+    return autorange.RAW_TARGET_MIN <= raw <= autorange.RAW_TARGET_MAX
+
+
+def legacy_cycle(level, state):
+    """The stepping loop of the old smart_measure_auto, on the simulated sensor"""
+    g, t = state
+    conversions, cost = 0, 0.0
+    bright_streak = dark_streak = 0
+    for _ in range(MAX_CONVERSIONS):
+        raw, adcof = read(level, g, t)
+        conversions += 1
+        cost += TIMES_MS[t] + 2
+        too_bright_hard = adcof or raw >= autorange.RAW_HARD_HIGH
+        too_dark_hard = raw <= autorange.RAW_HARD_LOW
+        if too_bright_hard or (raw > autorange.RAW_TARGET_MAX and bright_streak >= 1):
+            bright_streak += 1
+            dark_streak = 0
+            if g > 0:
+                g = max(0, g - (2 if too_bright_hard else 1))
+            elif t > 0:
+                t -= 1
+            else:
+                break
+            cost += CONF_MS
+            continue
+        if too_dark_hard or (raw < autorange.RAW_TARGET_MIN and dark_streak >= 1):
+            dark_streak += 1
+            bright_streak = 0
+            if t < len(TIMES_MS) - 1:
+                t += 1
+            elif g < len(GAIN_LEVELS) - 1:
+                g += 1
+            else:
+                break
+            cost += CONF_MS
+            continue
+        break
+    return (g, t), raw, conversions, cost
+
+
+def predictive_cycle(level, state, ranger):
+    g, t = state
+    conversions, cost = 0, 0.0
+    for _ in range(4):
+        raw, adcof = read(level, g, t)
+        conversions += 1
+        cost += TIMES_MS[t] + 2
+        new = ranger.update(raw, adcof, g, t)
+        if new is None:
+            break
+        g, t = new
+        cost += CONF_MS
+    return (g, t), raw, conversions, cost
+
+
+def converge(cycle, level, state, limit = 10):
+    """Run measurement cycles until a reading is in band (or the range is at its
+    limit, for light the sensor cannot bring into band); total conversions and ms"""
+    limits = ((0, 0), (len(GAIN_LEVELS) - 1, len(TIMES_MS) - 1))
+    conversions, cost = 0, 0.0
+    for _ in range(limit):
+        state, raw, n, c = cycle(level, state)
+        conversions += n
+        cost += c
+        if in_band(raw) or state in limits:
+            break
+    return state, conversions, cost
+
+
+def replay(levels):
+    rows = []
+    legacy_state = predictive_state = (0, len(TIMES_MS) - 1)
+    ranger = autorange.AutoRange(GAIN_LEVELS, TIMES_MS)
+    for level in levels:
+        legacy_state, n_old, ms_old = converge(legacy_cycle, level, legacy_state)
+        predictive_state, n_new, ms_new = converge(
+            lambda lv, st: predictive_cycle(lv, st, ranger), level, predictive_state)
+        rows.append((level, n_old, ms_old, n_new, ms_new))
+    return rows
+
+
+def main(argv):
+    if argv:
+        with open(argv[0]) as f:
+            scenarios = [(argv[0], [float(line.split(",")[0]) for line in f if line.strip()])]
+    else:
+        scenarios = SCENARIOS
+    print("{:<18} {:>9} | {:>6} {:>8} | {:>6} {:>8}".format(
+        "scenario", "level", "steps", "ms", "pred.", "ms"))
+    slow = []
+    for name, levels in scenarios:
+        for i, (level, n_old, ms_old, n_new, ms_new) in enumerate(replay(levels)):
+            print("{:<18} {:>9.3f} | {:>6} {:>8.0f} | {:>6} {:>8.0f}".format(
+                name or "", level, n_old, ms_old, n_new, ms_new))
+            if i and n_new > MAX_PREDICTIVE:
+                slow.append("{} -> {}: {} conversions".format(levels[i - 1], level, n_new))
+            name = ""
+    for msg in slow:
+        print("FAIL: " + msg + ", expected at most {}".format(MAX_PREDICTIVE))
+    return 1 if slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,228 @@
+"""Stage-by-stage benchmark of the whole measuring loop on simulated hardware.
+
+    python -m benchmarks.suite [--cycles N] [--frames N] [--out FILE] [--compare FILE]
+
+Everything runs against lib.sim: czujkaUV is imported with CZUJKAUV_SIM=1,
+so the AS7331 is a SimAS7331 (conversions take the real integration time)
+and every LCD_* driver writes to a RecordingSpi.
+
+Scenarios:
+
+    steady        constant light
+    step          dim light, then a x200 step halfway through
+    alarm         light flapping across the UVA alarm threshold every cycle
+    LCD_*         ShowImage of changing frames and clear() for every driver
+
+Per stage the latency percentiles (ms) are reported, plus SPI bytes per
+frame, I2C transactions per cycle and the peak traced allocation per frame
+(tracemalloc, measured in a separate replay so it does not skew timings).
+--out writes the results as JSON; --compare prints p50 ratios against an
+earlier JSON file.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+import lib
+from lib import sim
+
+# light levels in counts at gain 1x and 1 ms; ~340 uW/cm2 per unit on UVA
+STEADY = (5.0, 1.0, 0.2)
+DIM = (0.05, 0.01, 0.002)
+BRIGHT = (30.0, 1.0, 0.2)
+
+
+def steady(cycle, cycles):
+    return STEADY
+
+
+def step(cycle, cycles):
+    return DIM if cycle < cycles // 2 else (10.0, 2.0, 0.4)
+
+
+def alarm(cycle, cycles):
+    return BRIGHT if cycle % 2 else STEADY
+
+
+LOOP_SCENARIOS = [("steady", steady), ("step", step), ("alarm", alarm)]
+
+
+def percentiles(samples):
+    a = np.asarray(samples, dtype = float)
+    return {
+        "n": int(a.size),
+        "mean": float(a.mean()),
+        "p50": float(np.percentile(a, 50)),
+        "p90": float(np.percentile(a, 90)),
+        "p99": float(np.percentile(a, 99)),
+        "max": float(a.max()),
+    }
+
+
+def alloc_peaks(func, calls):
+    """Peak traced KiB above the starting level for every func(*args) in calls"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for args in calls:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func(*args)
+            peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1024.0)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def load_czujka():
+    os.environ["CZUJKAUV_SIM"] = "1"
+    with contextlib.redirect_stdout(io.StringIO()):
+        czujka = importlib.import_module("czujkaUV")
+        czujka.open_bus()
+        czujka.open_display()
+    return czujka
+
+
+def run_loop(czujka, light, cycles):
+    sensor = czujka.bus.devices[czujka.I2C_ADDR]
+    spi = czujka.disp.SPI
+    with contextlib.redirect_stdout(io.StringIO()):
+        czujka.init_sensor()
+    czujka.screen.invalidate()
+
+    stages = {"acquire": [], "convert": [], "display": [], "cycle": []}
+    spi_bytes = []
+    i2c = []
+    inputs = []
+    for cycle in range(cycles):
+        sensor.light = light(cycle, cycles)
+        i2c_before = czujka.bus.transactions
+        sample, t_acq = timed(czujka.smart_measure_auto)
+        _, t_conv = timed(czujka.raw_to_uW_cm2, *sample)
+        spi_before = spi.bytes
+        _, t_disp = timed(czujka.lcd_display, *sample)
+        stages["acquire"].append(t_acq)
+        stages["convert"].append(t_conv)
+        stages["display"].append(t_disp)
+        stages["cycle"].append(t_acq + t_conv + t_disp)
+        spi_bytes.append(spi.bytes - spi_before)
+        i2c.append(czujka.bus.transactions - i2c_before)
+        inputs.append(sample)
+
+    czujka.screen.invalidate()
+    allocs = alloc_peaks(czujka.lcd_display, inputs)
+    return {
+        "stages_ms": {name: percentiles(v) for name, v in stages.items()},
+        "spi_bytes_per_frame": percentiles(spi_bytes),
+        "i2c_transactions_per_cycle": percentiles(i2c),
+        "alloc_peak_kib_per_frame": percentiles(allocs),
+    }
+
+
+def run_driver(name, frames):
+    disp = sim.make_display(lib.driver(name))
+    try:
+        disp.Init()
+        spi = disp.SPI
+        size = (disp.width, disp.height)
+        rng = np.random.default_rng(0)
+        images = [Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype = np.uint8), "RGB")
+                  for _ in range(4)]
+
+        stages = {"ShowImage": [], "clear": []}
+        spi_bytes = []
+        for i in range(frames):
+            before = spi.bytes
+            _, t = timed(disp.ShowImage, images[i % len(images)])
+            stages["ShowImage"].append(t)
+            spi_bytes.append(spi.bytes - before)
+            _, t = timed(disp.clear)
+            stages["clear"].append(t)
+
+        allocs = alloc_peaks(disp.ShowImage, [(images[i % len(images)],) for i in range(min(frames, 10))])
+        return {
+            "size": list(size),
+            "stages_ms": {stage: percentiles(v) for stage, v in stages.items()},
+            "spi_bytes_per_frame": percentiles(spi_bytes),
+            "alloc_peak_kib_per_frame": percentiles(allocs),
+        }
+    finally:
+        sim.close_display(disp)
+
+
+def report(results):
+    for name, res in results["scenarios"].items():
+        extra = ""
+        if "i2c_transactions_per_cycle" in res:
+            extra = " | i2c/cycle {:.1f}".format(res["i2c_transactions_per_cycle"]["mean"])
+        print("{}  spi B/frame {:.0f} | alloc KiB/frame {:.1f}{}".format(
+            name, res["spi_bytes_per_frame"]["mean"], res["alloc_peak_kib_per_frame"]["p50"], extra))
+        for stage, p in res["stages_ms"].items():
+            print("    {:<10} p50 {:8.3f}  p90 {:8.3f}  p99 {:8.3f}  max {:8.3f} ms".format(
+                stage, p["p50"], p["p90"], p["p99"], p["max"]))
+
+
+def compare(results, baseline):
+    print("p50 ratio against baseline (new / old):")
+    for name, res in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        for stage, p in res["stages_ms"].items():
+            if stage in old["stages_ms"] and old["stages_ms"][stage]["p50"] > 0:
+                print("    {:<12} {:<10} {:6.2f}x".format(name, stage, p["p50"] / old["stages_ms"][stage]["p50"]))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the measuring loop on simulated hardware")
+    parser.add_argument("--cycles", type = int, default = 40, help = "measuring cycles per loop scenario")
+    parser.add_argument("--frames", type = int, default = 30, help = "frames per LCD driver")
+    parser.add_argument("--only", choices = ["loop", "drivers"], help = "run one group of scenarios")
+    parser.add_argument("--out", help = "write results as JSON")
+    parser.add_argument("--compare", help = "JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    if args.only != "drivers":
+        czujka = load_czujka()
+        for name, light in LOOP_SCENARIOS:
+            results["scenarios"][name] = run_loop(czujka, light, args.cycles)
+        sim.close_display(czujka.disp)
+    if args.only != "loop":
+        for name in lib.DRIVERS:
+            results["scenarios"]["LCD_" + name] = run_driver(name, args.frames)
+
+    report(results)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,110 +1,169 @@
-from smbus2 import SMBus
+import os
+import threading
 import time
 
-from lib import LCD_1inch14
-from PIL import Image, ImageDraw, ImageFont
-
-try:
-    font_title = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)
-    font_big   = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)
-except:
-    font_title = ImageFont.load_default()
-    font_big   = ImageFont.load_default()
-
-disp = LCD_1inch14.LCD_1inch14()
-disp.Init()
-disp.clear()
-disp.bl_DutyCycle(50)
-
-font = ImageFont.load_default()
+import lib
+from lib import autorange, uvconvert
+from lib.as7331 import (AS7331, MMODE_CMD, MMODE_CONT, MMODE_SYND, BURST_LEN, BURST_LEN_OUTCONV,
+                        STATUS_ADCOF, GAIN_LEVELS, TIME_STEPS)
+
+# CZUJKAUV_SIM=1: symulowany AS7331 i zapisujące SPI z lib/sim (bez sprzętu)
+SIMULATE = os.environ.get("CZUJKAUV_SIM") == "1"
+
+LCD_DRIVER = "1inch14"
+# Obrót obrazu 0/90/180/270 stopni, realizowany przez MADCTL sterownika (bez obracania w numpy)
+LCD_ORIENTATION = 0
+# Tryb płótna: "RGB" - 24-bit z wygładzanym tekstem (domyślnie),
+# "P" - paleta 8-bit (kodowanie RGB565 jedną tablicą, tekst bez wygładzania)
+LCD_MODE = "RGB"
+# Piny DC/RST wyświetlacza: "gpiozero", "lgpio", "gpiomem" (rejestry, Pi 1-4) lub "sim" (lib/gpio)
+LCD_GPIO = os.environ.get("CZUJKAUV_GPIO", "gpiozero")
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# Import nie dotyka sprzętu: wyświetlacz tworzy open_display(), magistralę open_bus()
+disp = None
+screen = None
+screen_mode = "POMIAR"
+font_title = None
+font_big = None
+text_title = None
+text_big = None
+alarm_screens = {}
 
 I2C_ADDR = 0x74
-bus = SMBus(1)
-
-OSR   = 0x00
-CREG1 = 0x06
-CREG3 = 0x08
-MRES1 = 0x02 
-
-STATUS_ADDR = 0x00 
+bus = None
+
+# Kilka czujników naraz (lib/sensors): (numer magistrali, adres 0x74..0x77),
+# np. [(1, 0x74), (1, 0x75), (3, 0x74)]; przy więcej niż jednym main uruchamia run_multi()
+SENSORS = [(1, I2C_ADDR)]
+
+# Zapis pomiarów (lib/uvstore); CZUJKAUV_STORE="" wyłącza, w symulacji domyślnie wyłączony
+STORE_DIR = os.environ.get("CZUJKAUV_STORE", "" if SIMULATE else os.path.expanduser("~/pomiary_uv"))
+STORE_SEGMENT_BYTES = 1 << 20          # ~37 tys. rekordów na segment
+STORE_RETENTION_S = 90 * 24 * 3600     # 90 dni
+STORE_MAX_BYTES = 256 << 20
+STORE_FLUSH_RECORDS = 256
+STORE_FLUSH_S = 60.0
+
+# Ostatnie pomiary w pamięci (lib/ringbuffer) dla trendów i alarmów
+HISTORY_SIZE = 3600
+HISTORY_WINDOWS = (60, 900)            # s
+history = None
+
+# Dawka (lib/uvdose): okna 1 min / 15 min / 8 h, limity w J/m2 (domyślnie ICNIRP 8 h)
+DOSE_WINDOWS = (60, 15 * 60, 8 * 3600)
+DOSE_LIMITS = None                     # None = uvdose.DOSE_LIMITS
+dose = None
+
+# CMD: każdy pomiar osobno startowany, CONT: czujnik mierzy sam, czytamy gotowe wyniki
+MEASURE_MODE = MMODE_CMD
+CONT_BREAK_US = 0
+
+# SYND: czas pomiaru wyznaczają zbocza na pinie SYN (BCM), None = nie podłączony
+SYN_PIN = None
+CLOCK_KHZ = 1024
+
+# READY czujnika (BCM): koniec konwersji jako zbocze zamiast sleep + odpytywania STATUS.
+# None = nie podłączony, wtedy odpytywanie jak dotąd.
+READY_PIN = None
 
 RE_BASE_UVA = 385
 RE_BASE_UVB = 347
+RE_BASE_UVC = 794
 
 UVA_ALARM_TSH = 5000.0
 UVB_ALARM_TSH = 500.0
 
-GAIN_LEVELS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048]
-
-TIME_STEPS = [0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06]
-
 def time_code_to_ms(code: int) -> int:
     return 1 << (code & 0x0F)
 
 BASE_TIME_CODE = 0x06
 BASE_TIME_MS = time_code_to_ms(BASE_TIME_CODE)
+converter = uvconvert.Converter((RE_BASE_UVA, RE_BASE_UVB, RE_BASE_UVC), BASE_TIME_MS)
+
+# Stan czujnika (zakres, ostatnio zapisane rejestry) trzyma obiekt as7331.AS7331 z open_bus()
+sensor = None
+
+# Przewidywanie zakresu: zwykle 1-2 konwersje po skoku oświetlenia
+auto_range = autorange.AutoRange(GAIN_LEVELS, [time_code_to_ms(c) for c in TIME_STEPS])
+RANGE_MAX_STEPS = 4
+
+cont_running = False
+cont_next_ready = 0.0
+syn_out = None
+last_measurement = None
+ready_in = None
+ready_event = threading.Event()
+
+def set_screen_mode(mode, background, template=None):
+    """Ekran czyszczony tylko przy zmianie trybu (pomiar <-> alarm)"""
+    global screen_mode
+    if mode != screen_mode:
+        screen.fill(background)
+        if template is not None:
+            screen.push(template)
+        screen_mode = mode
+
+ALARM_HEADER = ["UWAGA!", "NIEBEZPIECZNA", "DAWKA", "PROMIENIOWANIA"]
+ALARM_SPACING = 3
+
+def build_alarm_screen(band):
+    """Statyczna część ekranu alarmu (tło + nagłówek), renderowana i kodowana raz.
+
+    Zwraca gotową ramkę RGB565, pusty pasek pod linię z wartością i jego okno.
+    """
+    from PIL import Image
+    unit = "uW/cm2"
+    image = Image.new(LCD_MODE, (disp.width, disp.height), "RED")
+
+    header = ALARM_HEADER + [band]
+    lines = header + [f"{band}: {0.0:7.2f} {unit}"]
+
+    heights = [text_big.textsize(ln)[1] for ln in lines]
+    total_h = sum(heights) + ALARM_SPACING * (len(lines) - 1)
+    y0 = (disp.height - total_h) // 2
+
+    draw_centered_lines(image, header, text_big, "BLACK", y_top=y0, spacing=ALARM_SPACING)
+
+    y_value = y0 + sum(heights[:-1]) + ALARM_SPACING * len(header)
+    # dół najniższego znaku, jaki może się pojawić w linii z wartością
+    # (textbbox działa też z bitmapową czcionką load_default, getmetrics nie)
+    bottom = text_big.textbbox(f"{band}: -0123456789. {unit}")[3]
+    box = (0, y_value, disp.width, min(disp.height, y_value + bottom))
+
+    return {
+        "pix": disp.image_to_rgb565(image),
+        "strip": image.crop(box),
+        "box": box,
+    }
+
+def show_alarm(band, value):
+    """Ekran alarmu: szablon z pamięci + tylko linia z wartością jako okno częściowe"""
+    scr = alarm_screens[band]
+    set_screen_mode(band, "RED", scr["pix"])
 
-current_gain_index = 0                 
-current_time_step_idx = TIME_STEPS.index(0x06)  
+    line = f"{band}: {value:7.2f} uW/cm2"
+    strip = disp.frame_pool.canvas(band, scr["strip"])
+    w, _ = text_big.textsize(line)
+    text_big.text(strip, ((strip.width - w) // 2, 0), line, "BLACK")
+
+    x0, y0 = scr["box"][:2]
+    screen.push(disp.frame_pool.encode(strip), origin=(x0, y0))
 
 def lcd_display(uva_raw, uvb_raw, gain, time_ms):
     uva_val, uvb_val = raw_to_uW_cm2(uva_raw, uvb_raw, gain, time_ms)
 
-    disp.clear()
-    unit = "uW/cm2"
-
     if uva_val >= UVA_ALARM_TSH:
-        image = Image.new("RGB", (disp.width, disp.height), "RED")
-        draw = ImageDraw.Draw(image)
-
-        lines = [
-            "UWAGA!",
-            "NIEBEZPIECZNA",
-            "DAWKA",
-            "PROMIENIOWANIA",
-            "UVA",
-            f"UVA: {uva_val:7.2f} {unit}", 
-        ]
-
-        tmp_heights = []
-        for ln in lines:
-            bb = draw.textbbox((0, 0), ln, font=font_big)
-            tmp_heights.append(bb[3] - bb[1])
-        spacing = 3
-        total_h = sum(tmp_heights) + spacing * (len(lines) - 1)
-        y0 = (disp.height - total_h) // 2
-
-        draw_centered_lines(draw, lines, font_big, "BLACK", y_top=y0, spacing=spacing)
-        disp.ShowImage(image)
+        show_alarm("UVA", uva_val)
         return
 
     if uvb_val >= UVB_ALARM_TSH:
-        image = Image.new("RGB", (disp.width, disp.height), "RED")
-        draw = ImageDraw.Draw(image)
-
-        lines = [
-            "UWAGA!",
-            "NIEBEZPIECZNA",
-            "DAWKA",
-            "PROMIENIOWANIA",
-            "UVB",
-            f"UVB: {uvb_val:7.2f} {unit}", 
-        ]
-
-        tmp_heights = []
-        for ln in lines:
-            bb = draw.textbbox((0, 0), ln, font=font_big)
-            tmp_heights.append(bb[3] - bb[1])
-        spacing = 3
-        total_h = sum(tmp_heights) + spacing * (len(lines) - 1)
-        y0 = (disp.height - total_h) // 2
-
-        draw_centered_lines(draw, lines, font_big, "BLACK", y_top=y0, spacing=spacing)
-        disp.ShowImage(image)
+        show_alarm("UVB", uvb_val)
         return
-    
-    image = Image.new("RGB", (disp.width, disp.height), "BLACK")
-    draw = ImageDraw.Draw(image)
+
+    set_screen_mode("POMIAR", "BLACK")
+    # płótno z puli wyświetlacza, czyszczone w miejscu zamiast Image.new co ramkę
+    image = disp.frame_pool.canvas("POMIAR", "BLACK", mode=LCD_MODE)
 
     title = "POMIAR UV"
     unit = "uW/cm2"
@@ -112,14 +171,11 @@ def lcd_display(uva_raw, uvb_raw, gain, time_ms):
     line1 = f"UVA:{uva_val:7.2f} {unit}"
     line2 = f"UVB:{uvb_val:7.2f} {unit}"
 
-    tb = draw.textbbox((0, 0), title, font=font_title)
-    tw, th = tb[2] - tb[0], tb[3] - tb[1]
-    draw.text(((disp.width - tw) // 2, 6), title, font=font_title, fill="WHITE")
+    tw, th = text_title.textsize(title)
+    text_title.text(image, ((disp.width - tw) // 2, 6), title, "WHITE")
 
-    b1 = draw.textbbox((0, 0), line1, font=font_big)
-    w1, h1 = b1[2] - b1[0], b1[3] - b1[1]
-    b2 = draw.textbbox((0, 0), line2, font=font_big)
-    w2, h2 = b2[2] - b2[0], b2[3] - b2[1]
+    w1, h1 = text_big.textsize(line1)
+    w2, h2 = text_big.textsize(line2)
 
     spacing = 6
     total_h = h1 + spacing + h2
@@ -128,27 +184,19 @@ def lcd_display(uva_raw, uvb_raw, gain, time_ms):
     x1 = (disp.width - w1) // 2
     x2 = (disp.width - w2) // 2
 
-    draw.text((x1, y0), line1, font=font_big, fill="CYAN")
-    draw.text((x2, y0 + h1 + spacing), line2, font=font_big, fill="YELLOW")
+    text_big.text(image, (x1, y0), line1, "CYAN")
+    text_big.text(image, (x2, y0 + h1 + spacing), line2, "YELLOW")
 
-    disp.ShowImage(image)
+    screen.show(image)
 
 
-def draw_centered_lines(draw, lines, font, fill, y_top=0, spacing=4):
+def draw_centered_lines(image, lines, layout, fill, y_top=0, spacing=4):
 
-    heights = []
-    widths = []
-    for ln in lines:
-        bb = draw.textbbox((0, 0), ln, font=font)
-        widths.append(bb[2] - bb[0])
-        heights.append(bb[3] - bb[1])
-
-    total_h = sum(heights) + spacing * (len(lines) - 1)
     y = y_top
-
-    for ln, w, h in zip(lines, widths, heights):
+    for ln in lines:
+        w, h = layout.textsize(ln)
         x = (disp.width - w) // 2
-        draw.text((x, y), ln, font=font, fill=fill)
+        layout.text(image, (x, y), ln, fill)
         y += h + spacing
 
 
@@ -157,31 +205,22 @@ def gain_index_to_reg_code(gain_index: int) -> int:
     return 11 - gain_index
 
 def set_conf(gain_index: int, time_code: int):
-    """Ustawia GAIN i TIME (time_code to KOD 0..15, nie indeks listy)"""
-    gain_index = max(0, min(11, gain_index))
-    time_code  = time_code & 0x0F
-
-    gain_code = gain_index_to_reg_code(gain_index)
-    config_byte = ((gain_code & 0x0F) << 4) | time_code
-
-    bus.write_byte_data(I2C_ADDR, OSR, 0x02)
-    time.sleep(0.005)
-    bus.write_byte_data(I2C_ADDR, CREG1, config_byte)
-    time.sleep(0.005)
+    """Ustawia GAIN i TIME (time_code to KOD 0..15, nie indeks listy); bez zmian nic nie wysyła"""
+    global cont_running
+    if sensor.configure(gain_index=gain_index, time_code=time_code):
+        # stan konfiguracji zatrzymuje tryb CONT
+        cont_running = False
 
 def init_sensor():
-    global current_gain_index, current_time_step_idx
+    global cont_running
     try:
-        bus.write_byte_data(I2C_ADDR, OSR, 0x02)
-        time.sleep(0.05)
-
-        current_gain_index = 0  # 1x
-        current_time_step_idx = TIME_STEPS.index(0x06)  # 64ms
-        set_conf(current_gain_index, TIME_STEPS[current_time_step_idx])
+        # czas startu układu pilnuje sensor (termin, nie stały sleep)
+        sensor.reset()
 
-        #CMD mode
-        bus.write_byte_data(I2C_ADDR, CREG3, 0x40)
-        time.sleep(0.01)
+        # 1x, 64 ms i tryb pomiaru jedną transakcją
+        sensor.configure(gain_index=0, time_code=0x06, mmode=MEASURE_MODE, break_us=CONT_BREAK_US)
+        cont_running = False
+        init_ready_pin()
 
         print("AS7331 jest połączony")
         return True
@@ -189,143 +228,302 @@ def init_sensor():
         print(f"Błąd init: {e}")
         return False
 
-def read_status_byte():
-    data = bus.read_i2c_block_data(I2C_ADDR, STATUS_ADDR, 2)
-    return data[1]
-
-def read_measurement():
-
-    try:
-        data = bus.read_i2c_block_data(I2C_ADDR, MRES1, 4)
-        uva = data[0] | (data[1] << 8)
-        uvb = data[2] | (data[3] << 8)
-        return uva, uvb
-    except OSError:
-        return None, None
+def set_measure_mode(mmode: int, break_us: int = CONT_BREAK_US, edges: int = 1):
+    """Tryb pomiaru w CREG3 (CMD / CONT / SYND), ustawiany w stanie konfiguracji"""
+    global MEASURE_MODE, cont_running
+    if mmode == MMODE_SYND and SYN_PIN is None:
+        raise ValueError("SYND wymaga podłączonego pinu SYN (SYN_PIN)")
+    if sensor.configure(mmode=mmode, break_us=break_us, edges=edges):
+        cont_running = False
+    MEASURE_MODE = mmode
+
+def init_ready_pin():
+    """Wejście READY przez gpiozero (ten sam stos co lcdconfig), zbocze ustawia ready_event"""
+    global ready_in
+    if READY_PIN is None or ready_in is not None:
+        return
+    from gpiozero import DigitalInputDevice
+    # READY jest push-pull (CREG3.RDYOD=0), więc bez podciągania
+    ready_in = DigitalInputDevice(READY_PIN, pull_up=None, active_state=True)
+    ready_in.when_activated = ready_event.set
+
+def wait_result(timeout_s: float, done, length: int = BURST_LEN):
+    """Wynik od razu po zboczu READY; bez pinu (albo gdy zbocze nie przyjdzie) odpytuje STATUS"""
+    if ready_in is not None and ready_event.wait(timeout_s):
+        ready_event.clear()
+        m = sensor.read(length)
+        if done(m):
+            return m
+        timeout_s = 0.05
+    return wait_ready(sensor.read(length), timeout_s, done, length)
+
+def wait_ready(m, timeout_s: float, done, length: int = BURST_LEN):
+    """Odpytuje OSR/STATUS+wyniki jednym odczytem, aż done(m) będzie spełnione"""
+    deadline = time.monotonic() + timeout_s
+    while not done(m) and time.monotonic() < deadline:
+        time.sleep(0.001)
+        m = sensor.read(length)
+    return m
 
 def measure_once(time_code: int):
-    bus.write_byte_data(I2C_ADDR, OSR, 0x83)
-
     t_ms = time_code_to_ms(time_code)
-    time.sleep((t_ms + 2) / 1000.0)
 
-    deadline = time.monotonic() + 0.05
-    status = read_status_byte()
-    notready = (status >> 2) & 1
-    while notready and time.monotonic() < deadline:
-        time.sleep(0.001)
-        status = read_status_byte()
-        notready = (status >> 2) & 1
-
-    uva, uvb = read_measurement()
-    return uva, uvb, status
+    ready_event.clear()
+    sensor.start()
+
+    if ready_in is None:
+        time.sleep((t_ms + 2) / 1000.0)
+        return wait_ready(sensor.read(), 0.05, lambda m: m.ready)
+    return wait_result(t_ms / 1000.0 + 0.05, lambda m: m.ready)
+
+def start_continuous(time_code: int):
+    """Start pomiarów CONT; pierwszy wynik po czasie całkowania"""
+    global cont_running, cont_next_ready
+    ready_event.clear()
+    sensor.start()
+    cont_running = True
+    cont_next_ready = time.monotonic() + (time_code_to_ms(time_code) + CONT_BREAK_US / 1000.0) / 1000.0
+
+def measure_continuous(time_code: int):
+    """Kolejny wynik w trybie CONT: bez startu i pełnego sleep na każdy pomiar.
+
+    Czujnik mierzy w kółko; czekamy tylko do przewidywanego końca bieżącej
+    konwersji i na bit NDATA (nowe dane) w STATUS.
+    """
+    global cont_next_ready
+    period = (time_code_to_ms(time_code) + CONT_BREAK_US / 1000.0) / 1000.0
+    if not cont_running:
+        start_continuous(time_code)
+
+    if ready_in is not None:
+        return wait_result(period + 0.05, lambda m: m.new_data)
+
+    wait = cont_next_ready - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+
+    m = wait_ready(sensor.read(), period + 0.05, lambda m: m.new_data)
+    cont_next_ready = time.monotonic() + period
+    return m
+
+def measure_next(time_code: int):
+    """Pomiar w bieżącym trybie; zwraca rekord as7331.Measurement (UVA, UVB, UVC, temp, status)"""
+    global last_measurement
+    if MEASURE_MODE == MMODE_CONT:
+        last_measurement = measure_continuous(time_code)
+    elif MEASURE_MODE == MMODE_SYND:
+        # okno SYN o długości czasu całkowania z time_code
+        last_measurement = measure_synd(time_code_to_ms(time_code) / 1000.0)[0]
+    else:
+        last_measurement = measure_once(time_code)
+    return last_measurement
+
+def measure_synd(duration_s: float):
+    """Pomiar SYND: start i koniec wyznaczają opadające zbocza na SYN (EDGES=1).
+
+    Rzeczywisty czas konwersji czujnik mierzy sam (OUTCONV, takty zegara),
+    zwracany jako time_ms do raw_to_uW_cm2. Wymaga SYN_PIN i set_measure_mode(as7331.MMODE_SYND).
+    """
+    global syn_out
+    if SYN_PIN is None:
+        raise RuntimeError("SYND wymaga podłączonego pinu SYN (SYN_PIN)")
+    if syn_out is None:
+        from gpiozero import DigitalOutputDevice
+        syn_out = DigitalOutputDevice(SYN_PIN, initial_value=True)
+
+    ready_event.clear()
+    sensor.start()
+    syn_out.off()
+    syn_out.on()
+    time.sleep(duration_s)
+    syn_out.off()
+    syn_out.on()
+
+    m = wait_result(0.05, lambda m: m.ready, BURST_LEN_OUTCONV)
+    if not m.ready:
+        return m, 0.0
+    return m, m.outconv / float(CLOCK_KHZ)
 
 def raw_to_uW_cm2(uva_raw: int, uvb_raw: int, gain: int, time_ms: int):
-
-    if uva_raw is None or uvb_raw is None:
+    """Przelicza surowe zliczenia na uW/cm2 z tablicy czułości gain x czas (lib/uvconvert)"""
+    if uva_raw is None or uvb_raw is None or not time_ms:
         return 0.0, 0.0
-
-    gain_factor = gain / 2048.0
-    time_factor = BASE_TIME_MS / float(time_ms)
-
-    Re_uva = RE_BASE_UVA * gain_factor
-    Re_uvb = RE_BASE_UVB * gain_factor
-
-    uva_uW_cm2 = (uva_raw / Re_uva) * time_factor if Re_uva > 0 else 0.0
-    uvb_uW_cm2 = (uvb_raw / Re_uvb) * time_factor if Re_uvb > 0 else 0.0
-
-    return uva_uW_cm2, uvb_uW_cm2
+    return converter.scalar(uva_raw, uvb_raw, gain, time_ms)
 
 
 
 def smart_measure_auto():
-    global current_gain_index, current_time_step_idx
-
-    RAW_TARGET_MIN = 2000
-    RAW_TARGET_MAX = 50000
-    RAW_HARD_LOW   = 300
-    RAW_HARD_HIGH  = 65000
-
-    bright_streak = 0
-    dark_streak = 0
-
+    """Pomiar z autozakresem: z jednego odczytu wyznacza docelowy GAIN/TIME (autorange)"""
     uva_raw = 0
     uvb_raw = 0
-    status_val = 0
+    used_gain_index = sensor.gain_index
+    used_time_idx = TIME_STEPS.index(sensor.time_code)
 
-    for _ in range(12):
+    for _ in range(RANGE_MAX_STEPS):
         try:
-            time_code = TIME_STEPS[current_time_step_idx]
-            uva_raw, uvb_raw, status_val = measure_once(time_code)
-
-            if uva_raw is None:
-                continue
+            time_idx = TIME_STEPS.index(sensor.time_code)
+            m = measure_next(sensor.time_code)
+            uva_raw, uvb_raw = m.uva, m.uvb
+            # zakres, w którym zrobiono zwracany pomiar
+            used_gain_index, used_time_idx = sensor.gain_index, time_idx
 
             raw_ref = max(uva_raw, uvb_raw)
+            saturated = bool(m.status & STATUS_ADCOF)
 
-            adcof = (status_val >> 5) & 1
-
-            too_bright_hard = adcof or (raw_ref >= RAW_HARD_HIGH)
-            too_dark_hard   = (raw_ref <= RAW_HARD_LOW)
-
-            too_bright_soft = (raw_ref > RAW_TARGET_MAX)
-            too_dark_soft   = (raw_ref < RAW_TARGET_MIN)
-
-            # ZA JASNO
-            if too_bright_hard or (too_bright_soft and bright_streak >= 1):
-                bright_streak += 1
-                dark_streak = 0
-
-                if current_gain_index > 0:
-                    step = 2 if too_bright_hard else 1
-                    current_gain_index = max(0, current_gain_index - step)
-                    set_conf(current_gain_index, TIME_STEPS[current_time_step_idx])
-                    continue
-
-                if current_time_step_idx > 0:
-                    current_time_step_idx -= 1
-                    set_conf(current_gain_index, TIME_STEPS[current_time_step_idx])
-                    continue
-
+            new_range = auto_range.update(raw_ref, saturated, sensor.gain_index, time_idx)
+            if new_range is None:
                 break
 
-            if too_dark_hard or (too_dark_soft and dark_streak >= 1):
-                dark_streak += 1
-                bright_streak = 0
-
-                if current_time_step_idx < (len(TIME_STEPS) - 1):
-                    current_time_step_idx += 1
-                    set_conf(current_gain_index, TIME_STEPS[current_time_step_idx])
-                    continue
-
-                if current_gain_index < 11:
-                    current_gain_index += 1
-                    set_conf(current_gain_index, TIME_STEPS[current_time_step_idx])
-                    continue
-
-                break
-            break
+            gain_index, time_idx = new_range
+            set_conf(gain_index, TIME_STEPS[time_idx])
 
         except OSError:
             continue
 
-    used_gain = GAIN_LEVELS[current_gain_index]
-    used_time_code = TIME_STEPS[current_time_step_idx]
+    used_gain = GAIN_LEVELS[used_gain_index]
+    used_time_code = TIME_STEPS[used_time_idx]
     used_time_ms = time_code_to_ms(used_time_code)
 
 
     return uva_raw, uvb_raw, used_gain, used_time_ms
 
-if not init_sensor():
-    exit(1)
-
-try:
-    while True:
-        uva_raw, uvb_raw, gain, time_ms = smart_measure_auto()
-        print(f"G:{gain:<4}x | T:{time_ms:>3}ms | RAW UVA:{uva_raw} UVB:{uvb_raw}")
-        lcd_display(uva_raw, uvb_raw, gain, time_ms)
-        time.sleep(2)
+def open_bus():
+    """Magistrala I2C czujnika (albo symulowana przy CZUJKAUV_SIM=1)"""
+    global bus, sensor
+    if SIMULATE:
+        from lib import sim
+        bus = sim.SimSMBus({I2C_ADDR: sim.SimAS7331()})
+    else:
+        from smbus2 import SMBus
+        bus = SMBus(1)
+    sensor = AS7331(bus, I2C_ADDR)
+    return bus
+
+def open_display():
+    """Wyświetlacz, czcionki i gotowe ekrany; moduł sterownika ładowany dopiero tutaj"""
+    global disp, screen, screen_mode, font_title, font_big, text_title, text_big, alarm_screens
+    from lib import framediff, textlayout
+    from PIL import ImageFont
 
-except KeyboardInterrupt:
-    bus.close()
+    try:
+        font_title = ImageFont.truetype(FONT_PATH, 20)
+        font_big   = ImageFont.truetype(FONT_PATH, 20)
+    except:
+        font_title = ImageFont.load_default()
+        font_big   = ImageFont.load_default()
+
+    text_title = textlayout.TextLayout(font_title)
+    text_big   = textlayout.TextLayout(font_big)
+    text_big.preload(mode = "1" if LCD_MODE == "P" else "L")
+
+    driver = lib.driver(LCD_DRIVER)
+    if SIMULATE:
+        from lib import sim
+        disp = sim.make_display(driver, gpio = LCD_GPIO, orientation = LCD_ORIENTATION)
+    else:
+        disp = driver(gpio = LCD_GPIO, orientation = LCD_ORIENTATION)
+    disp.Init()
+    disp.bl_DutyCycle(50)
+    screen = framediff.FrameDiff(disp)
+    screen.fill("BLACK")
+    screen_mode = "POMIAR"
+
+    alarm_screens = {band: build_alarm_screen(band) for band in ("UVA", "UVB")}
+    return disp
+
+def run(cycles=None):
+    """Pętla pomiarowa; cycles=None działa do Ctrl+C"""
+    open_bus()
+    if not init_sensor():
+        exit(1)
+    # w CONT czujnik całkuje już pierwszy pomiar, gdy inicjalizuje się wyświetlacz
+    if MEASURE_MODE == MMODE_CONT:
+        start_continuous(sensor.time_code)
+    open_display()
+
+    global history, dose
+    from lib import displayworker, ringbuffer, uvdose
+    history = ringbuffer.SampleRing(HISTORY_SIZE, ("uva", "uvb"), HISTORY_WINDOWS)
+    dose = uvdose.DoseEngine(DOSE_WINDOWS, DOSE_LIMITS)
+
+    store = None
+    if STORE_DIR:
+        from lib import uvstore
+        store = uvstore.UVStore(STORE_DIR, STORE_SEGMENT_BYTES, STORE_RETENTION_S, STORE_MAX_BYTES,
+                                STORE_FLUSH_RECORDS, STORE_FLUSH_S)
+
+    # Rysowanie i SPI w osobnym wątku - wolna ramka nie opóźnia pomiaru
+    display_worker = displayworker.DisplayWorker(lcd_display)
+    display_worker.start()
 
+    try:
+        n = 0
+        while cycles is None or n < cycles:
+            n += 1
+            uva_raw, uvb_raw, gain, time_ms = smart_measure_auto()
+            m = last_measurement
+            extra = f" UVC:{m.uvc} | {m.temp_c:.1f}C" if m is not None else ""
+            uva_val, uvb_val = raw_to_uW_cm2(uva_raw, uvb_raw, gain, time_ms)
+            now = time.monotonic()
+            history.push(now, uva_val, uvb_val)
+            for band, window in dose.feed(now, uva_val, uvb_val, time_ms):
+                print(f"ALARM DAWKI {band.upper()}: {dose.dose(band, window):.1f} J/m2 w {window // 60} min")
+            extra += f" | max 60s UVB:{history.max('uvb', 60):.2f}"
+            print(f"G:{gain:<4}x | T:{time_ms:>3}ms | RAW UVA:{uva_raw} UVB:{uvb_raw}{extra}")
+            if store is not None:
+                store.append(time.time(), gain, time_ms, uva_raw, uvb_raw, m.uvc if m else 0,
+                             uva_val, uvb_val, m.status if m else 0)
+            display_worker.submit(uva_raw, uvb_raw, gain, time_ms)
+            time.sleep(2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        display_worker.stop()
+        print(f"Ramki: {display_worker.rendered} narysowane, {display_worker.dropped} pominięte")
+        if store is not None:
+            store.close()
+        bus.close()
+
+def run_multi(seconds=None):
+    """Wszystkie czujniki z SENSORS mierzą równolegle (bez wyświetlacza); na końcu wydajność"""
+    from lib import sensors
+    if SIMULATE:
+        from lib import sim
+    else:
+        from smbus2 import SMBus
+
+    buses = {}
+    for bus_id, addr in SENSORS:
+        if bus_id not in buses:
+            buses[bus_id] = sim.SimSMBus() if SIMULATE else SMBus(bus_id)
+        if SIMULATE:
+            buses[bus_id].devices[addr] = sim.SimAS7331()
+
+    def on_sample(sensor, m, gain, time_ms):
+        uva_val, uvb_val = raw_to_uW_cm2(m.uva, m.uvb, gain, time_ms)
+        print(f"{sensor.name} | G:{gain:<4}x | T:{time_ms:>3}ms | UVA:{uva_val:8.2f} UVB:{uvb_val:8.2f} uW/cm2")
+
+    manager = sensors.SensorManager(buses, on_sample)
+    for bus_id, addr in SENSORS:
+        manager.add(bus_id, addr)
+    manager.start()
+    try:
+        if seconds is None:
+            while True:
+                time.sleep(1)
+        else:
+            time.sleep(seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        for name, rate in manager.throughput().items():
+            print(f"{name}: {rate:.1f} pomiarów/s")
+        for b in buses.values():
+            b.close()
+
+if __name__ == "__main__":
+    if len(SENSORS) > 1:
+        run_multi()
+    else:
+        run()
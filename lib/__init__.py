@@ -0,0 +1,21 @@
+"""Waveshare LCD drivers and the helpers around them.
+
+Drivers are looked up by panel name:
+
+    cls = lib.driver("1inch14")       # or "LCD_1inch14"
+    disp = cls()
+"""
+import importlib
+
+DRIVERS = ("0inch96", "1inch14", "1inch28", "1inch3", "1inch47", "1inch54",
+           "1inch69", "1inch8", "1inch9", "2inch", "2inch4")
+
+
+def driver(name):
+    """Driver class for a panel name, importing its module on first use"""
+    if name.startswith("LCD_"):
+        name = name[4:]
+    if name not in DRIVERS:
+        raise ValueError("unknown LCD driver {!r}, expected one of {}".format(name, ", ".join(DRIVERS)))
+    module = importlib.import_module(".LCD_" + name, __name__)
+    return getattr(module, "LCD_" + name)
@@ -0,0 +1,248 @@
+import time
+from collections import namedtuple
+
+ADDR = 0x74
+
+# Configuration state (OSR.DOS = 010), 8 bit registers
+OSR    = 0x00
+AGEN   = 0x02
+CREG1  = 0x06
+CREG2  = 0x07
+CREG3  = 0x08
+BREAK  = 0x09
+EDGES  = 0x0A
+OPTREG = 0x0B
+
+# Measurement state (OSR.DOS = 011), 16 bit little-endian registers
+OSR_STATUS = 0x00
+TEMP       = 0x01
+MRES1      = 0x02   # UVA
+MRES2      = 0x03   # UVB
+MRES3      = 0x04   # UVC
+OUTCONVL   = 0x05
+OUTCONVH   = 0x06
+
+# OSR values
+OSR_CONFIG  = 0x02
+OSR_MEASURE = 0x03
+OSR_START   = 0x83  # SS=1, DOS=measurement
+
+# CREG3.MMODE (bits 7:6)
+MMODE_CONT = 0x00
+MMODE_CMD  = 0x40
+MMODE_SYNS = 0x80
+MMODE_SYND = 0xC0
+
+# Ranges stepped through by auto-ranging: gain by index (CREG1[7:4] code =
+# 11 - index) and integration time codes (CREG1[3:0], 2^code ms)
+GAIN_LEVELS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048]
+TIME_STEPS = [0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06]
+
+# STATUS bits
+STATUS_POWERSTATE   = 0x01
+STATUS_STANDBYSTATE = 0x02
+STATUS_NOTREADY     = 0x04
+STATUS_NDATA        = 0x08
+STATUS_LDATA        = 0x10
+STATUS_ADCOF        = 0x20
+STATUS_MRESOF       = 0x40
+STATUS_OUTCONVOF    = 0x80
+
+# OSR/STATUS, TEMP, MRES1..MRES3 (+ OUTCONV for SYND)
+BURST_LEN         = 10
+BURST_LEN_OUTCONV = 13
+
+# Minimum timing, enforced as a deadline by AS7331 instead of a fixed sleep:
+# start-up after leaving power-down (OSR.PD=0) before the chip takes
+# commands. Configuration writes take effect at the I2C stop.
+T_STARTUP_S = 0.0012
+
+# CREG2 is never changed by this driver, so it keeps its power-on value
+# (EN_TM=1, no divider) and can bridge CREG1 and CREG3 in one block write
+CREG2_RESET = 0x40
+
+# registers kept in the shadow copy, in address order
+SHADOWED = (CREG1, CREG2, CREG3, BREAK, EDGES)
+
+# TEMP register (12 bit) -> deg C
+TEMP_LSB_C    = 0.05
+TEMP_OFFSET_C = -66.9
+
+
+class Measurement(namedtuple("Measurement", "osr status temp uva uvb uvc outconv", defaults = (0,))):
+    """One burst read of the measurement registers, raw counts"""
+    __slots__ = ()
+
+    @property
+    def ready(self):
+        return not self.status & STATUS_NOTREADY
+
+    @property
+    def new_data(self):
+        return bool(self.status & STATUS_NDATA)
+
+    @property
+    def overflow(self):
+        return bool(self.status & (STATUS_ADCOF | STATUS_MRESOF | STATUS_OUTCONVOF))
+
+    @property
+    def temp_c(self):
+        return (self.temp & 0x0FFF) * TEMP_LSB_C + TEMP_OFFSET_C
+
+
+def decode_burst(data):
+    d = data
+    return Measurement(
+        d[0], d[1],
+        d[2] | (d[3] << 8),
+        d[4] | (d[5] << 8),
+        d[6] | (d[7] << 8),
+        d[8] | (d[9] << 8),
+        (d[10] | (d[11] << 8) | (d[12] << 16)) if len(d) >= BURST_LEN_OUTCONV else 0,
+    )
+
+
+def read_burst(bus, addr = ADDR, length = BURST_LEN):
+    """Status, temperature and all three channels in one I2C transaction.
+
+    The register address write and the read are combined with a repeated
+    start (i2c_rdwr), and the measurement registers auto-increment.
+    """
+    from smbus2 import i2c_msg
+    write = i2c_msg.write(addr, [OSR_STATUS])
+    read = i2c_msg.read(addr, length)
+    bus.i2c_rdwr(write, read)
+    return decode_burst(bytes(read))
+
+
+class AS7331:
+    """One AS7331 on an SMBus-like bus with a shadow copy of its configuration.
+
+    configure() computes the wanted CREG1/CREG3/BREAK/EDGES bytes, compares
+    them with the shadow and writes only the bytes that differ. Runs of
+    neighbouring registers go out as one auto-incrementing block write
+    (bridging unchanged registers whose value is known), and all of it,
+    with the switch to configuration state, is one i2c_rdwr transaction.
+    An unchanged range costs no bus time and does not stop a running CONT
+    measurement. Instead of fixed sleeps the chip's minimum timing is kept
+    as a monotonic deadline that the next command waits out, usually
+    already past. The shadow assumes nothing else writes to the chip;
+    reset() forgets it.
+    """
+    __slots__ = ("bus", "addr", "gain_index", "time_code", "mmode", "break_us", "edges",
+                 "_osr", "_shadow", "_known", "_ready_at", "writes", "skipped")
+
+    def __init__(self, bus, addr = ADDR):
+        self.bus = bus
+        self.addr = addr
+        self.gain_index = 0         # gain 2^i, 1x..2048x
+        self.time_code = 0x06       # 2^code ms
+        self.mmode = MMODE_CMD
+        self.break_us = 0
+        self.edges = 1
+        self._osr = None            # last OSR value written, None = unknown
+        self._shadow = bytearray(OPTREG + 1)
+        self._shadow[CREG2] = CREG2_RESET
+        self._known = 1 << CREG2    # bit r set: _shadow[r] is what the chip holds
+        self._ready_at = 0.0
+        self.writes = 0
+        self.skipped = 0
+
+    @property
+    def gain(self):
+        return 1 << self.gain_index
+
+    @property
+    def time_ms(self):
+        return 1 << self.time_code
+
+    @property
+    def measuring(self):
+        return self._osr == OSR_START
+
+    def creg1(self):
+        return ((11 - self.gain_index) << 4) | self.time_code
+
+    def _wait(self):
+        wait = self._ready_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def reset(self):
+        """Forget the shadow and put the chip in configuration state"""
+        self._known = 1 << CREG2
+        self.bus.write_byte_data(self.addr, OSR, OSR_CONFIG)
+        self._osr = OSR_CONFIG
+        self._ready_at = time.monotonic() + T_STARTUP_S
+        self.writes += 1
+
+    def _block_writes(self, wanted):
+        """(start register, bytes) block writes bringing the chip to wanted {reg: value}"""
+        changed = [reg for reg in SHADOWED
+                   if reg in wanted and (not self._known >> reg & 1 or self._shadow[reg] != wanted[reg])]
+        blocks = []
+        for reg in changed:
+            if blocks:
+                start, data = blocks[-1]
+                gap = range(start + len(data), reg)
+                if all(r in wanted or self._known >> r & 1 for r in gap):
+                    data.extend(wanted.get(r, self._shadow[r]) for r in gap)
+                    data.append(wanted[reg])
+                    continue
+            blocks.append((reg, [wanted[reg]]))
+        return blocks
+
+    def configure(self, gain_index = None, time_code = None, mmode = None, break_us = None, edges = None):
+        """Apply settings, writing only what changed; True if anything was written.
+
+        After a write the chip is in configuration state, so a running
+        measurement has stopped and has to be started again.
+        """
+        if gain_index is not None:
+            self.gain_index = max(0, min(11, gain_index))
+        if time_code is not None:
+            self.time_code = time_code & 0x0F
+        if mmode is not None:
+            self.mmode = mmode
+        if break_us is not None:
+            self.break_us = break_us
+        if edges is not None:
+            self.edges = edges
+
+        wanted = {
+            CREG1: self.creg1(),
+            CREG3: self.mmode,
+            # pause between CONT conversions, in 8 us steps
+            BREAK: max(0, min(255, self.break_us // 8)),
+        }
+        if self.mmode == MMODE_SYND:
+            wanted[EDGES] = max(1, min(255, self.edges))
+        blocks = self._block_writes(wanted)
+        if not blocks:
+            self.skipped += 1
+            return False
+
+        from smbus2 import i2c_msg
+        msgs = []
+        if self._osr != OSR_CONFIG:
+            msgs.append(i2c_msg.write(self.addr, [OSR, OSR_CONFIG]))
+        msgs.extend(i2c_msg.write(self.addr, [reg] + data) for reg, data in blocks)
+        self._wait()
+        self.bus.i2c_rdwr(*msgs)
+        self._osr = OSR_CONFIG
+        for reg, data in blocks:
+            self._shadow[reg:reg + len(data)] = bytes(data)
+            for r in range(reg, reg + len(data)):
+                self._known |= 1 << r
+        self.writes += 1
+        return True
+
+    def start(self):
+        """Start a measurement (CMD: one conversion, CONT: conversions until reconfigured)"""
+        self._wait()
+        self.bus.write_byte_data(self.addr, OSR, OSR_START)
+        self._osr = OSR_START
+        self.writes += 1
+
+    def read(self, length = BURST_LEN):
+        return read_burst(self.bus, self.addr, length)
@@ -0,0 +1,78 @@
+RAW_TARGET     = 16000
+RAW_TARGET_MIN = 2000
+RAW_TARGET_MAX = 50000
+RAW_HARD_LOW   = 300
+RAW_HARD_HIGH  = 65000
+# Between cycles, readings in [RAW_HOLD_LOW, RAW_TARGET_MIN) or
+# (RAW_TARGET_MAX, RAW_HARD_HIGH) are held by the hysteresis; further out
+# the light really changed and the range moves at once.
+RAW_HOLD_LOW   = 1500
+
+# A clipped count only says "at least this bright"; back off by this much,
+# but to at most SATURATION_MAX_EXPOSURE (gain x ms), which still reads
+# bright lamps and daylight in band. Without the cap a clip at the longest
+# ranges (dark -> lamp on) takes a second clipped reading to come down.
+SATURATION_STEP = 32
+SATURATION_MAX_EXPOSURE = 128
+
+
+def predict_range(raw_ref, saturated, gain_index, time_idx, gains, times_ms, target = RAW_TARGET):
+    """(gain_index, time_idx) expected to bring raw_ref to about target in one step.
+
+    Counts scale linearly with gain x integration time, so the wanted
+    exposure is the current one times target / raw_ref. The longest time
+    that can reach it is chosen first and the gain rounded down, which lands
+    the next reading between target / 2 and target.
+    """
+    exposure = gains[gain_index] * times_ms[time_idx]
+    if saturated:
+        wanted = min(exposure / SATURATION_STEP, SATURATION_MAX_EXPOSURE)
+    else:
+        wanted = exposure * target / max(raw_ref, 1)
+    for t in range(len(times_ms) - 1, -1, -1):
+        for g in range(len(gains) - 1, -1, -1):
+            if gains[g] * times_ms[t] <= wanted:
+                return g, t
+    return 0, 0
+
+
+class AutoRange:
+    """Hysteresis around predict_range.
+
+    Inside [RAW_TARGET_MIN, RAW_TARGET_MAX] nothing changes. The first
+    reading after a range change (or the very first reading) re-ranges on
+    any count outside the band, so the caller re-measures at once and
+    lands in one or two conversions. Between cycles a reading that is only
+    mildly out of the band (see RAW_HOLD_LOW) has to repeat, on the same
+    side of the band, before the range moves; clipping or a count well
+    below the band re-ranges at once. Light flickering around the band edges therefore never moves a
+    settled range.
+
+    armed is the side of the band of the last mild reading (-1 below,
+    1 above), 0 when there is none; settling is True until a reading at
+    the current range has been accepted.
+    """
+
+    def __init__(self, gains, times_ms, target = RAW_TARGET):
+        self.gains = gains
+        self.times_ms = times_ms
+        self.target = target
+        self.armed = 0
+        self.settling = True
+
+    def update(self, raw_ref, saturated, gain_index, time_idx):
+        """New (gain_index, time_idx), or None when the reading is acceptable"""
+        saturated = saturated or raw_ref >= RAW_HARD_HIGH
+        hard = saturated or raw_ref < RAW_HOLD_LOW
+        side = -1 if raw_ref < RAW_TARGET_MIN else 1 if raw_ref > RAW_TARGET_MAX else 0
+        if not hard and not self.settling and (side == 0 or side != self.armed):
+            self.armed = side
+            return None
+        self.armed = 0
+        new = None
+        if side or hard:
+            new = predict_range(raw_ref, saturated, gain_index, time_idx, self.gains, self.times_ms, self.target)
+            if new == (gain_index, time_idx):
+                new = None
+        self.settling = new is not None
+        return new
@@ -0,0 +1,62 @@
+import logging
+import threading
+
+
+class DisplayWorker:
+    """Runs render(*args) on a dedicated thread, fed by a single-slot queue.
+
+    submit() never blocks: a value that has not been rendered yet is replaced
+    by the newer one ("latest value wins"), so a slow frame drops stale
+    readings instead of delaying the caller.
+    """
+
+    def __init__(self, render, name = "display"):
+        self.render = render
+        self.name = name
+        self._cond = threading.Condition()
+        self._pending = None
+        self._running = False
+        self._thread = None
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target = self._run, name = self.name, daemon = True)
+        self._thread.start()
+
+    def submit(self, *args):
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = args
+            self.submitted += 1
+            self._cond.notify()
+
+    def stop(self, timeout = None):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                args, self._pending = self._pending, None
+            try:
+                self.render(*args)
+                self.rendered += 1
+            except Exception:
+                self.errors += 1
+                logging.exception("display render failed")
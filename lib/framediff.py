@@ -0,0 +1,101 @@
+import numpy as np
+
+from .lcdconfig import color_to_rgb565
+
+
+def changed_boxes(old, new, gap = 8, out = None):
+    """Bounding boxes (Xstart, Ystart, Xend, Yend) of the pixels that differ.
+
+    old and new are RGB565 arrays of the same shape. Changed rows are grouped
+    into bands, and each band is split into column runs; runs closer than
+    gap pixels are merged, since a new window costs more than a few pixels.
+    out is an optional bool array of that shape for the per-pixel difference.
+    """
+    diff = np.not_equal(old, new, out = out)
+    rows = np.flatnonzero(diff.any(axis = 1))
+    boxes = []
+    for band in _runs(rows, gap):
+        Ystart, Yend = int(band[0]), int(band[-1]) + 1
+        cols = np.flatnonzero(diff[Ystart:Yend].any(axis = 0))
+        for run in _runs(cols, gap):
+            boxes.append((int(run[0]), Ystart, int(run[-1]) + 1, Yend))
+    return boxes
+
+
+def _runs(idx, gap):
+    if idx.size == 0:
+        return []
+    return np.split(idx, np.flatnonzero(np.diff(idx) > gap) + 1)
+
+
+class FrameDiff:
+    """Keeps a copy of what is on the panel and only sends what changed.
+
+    disp is any lcdconfig.RaspberryPi driver; windows are written with its
+    write_region, so coordinates are those of the display's current
+    orientation. When the orientation changes (set_orientation, or a
+    ShowImage of a swapped-size image) the copy no longer matches what is
+    on the panel, so the next frame is sent in full.
+    """
+
+    def __init__(self, disp, gap = 8):
+        self.disp = disp
+        self.gap = gap
+        self.last = None
+        self._madctl = disp.madctl
+        self._diff = np.empty((disp.height, disp.width), dtype = bool)
+        self.frames = 0
+        self.regions = 0
+        self.pixel_bytes = 0
+
+    def invalidate(self):
+        """Forget the panel contents, the next frame is sent in full"""
+        self.last = None
+
+    def _follow_orientation(self):
+        if self.disp.madctl != self._madctl:
+            self._madctl = self.disp.madctl
+            self._diff = np.empty((self.disp.height, self.disp.width), dtype = bool)
+            self.last = None
+
+    def fill(self, color):
+        """Clear the panel to one colour; afterwards only non-background pixels are sent"""
+        self._follow_orientation()
+        self.disp.clear(color)
+        self.last = np.full((self.disp.height, self.disp.width), color_to_rgb565(color), dtype = ">u2")
+        self.pixel_bytes += self.disp.width * self.disp.height * 2
+
+    def show(self, Image):
+        """Send the changed parts of a full-screen image.
+
+        Unlike ShowImage, an image of swapped size does not turn the panel;
+        call disp.set_orientation() first.
+        """
+        if Image.size != (self.disp.width, self.disp.height):
+            raise ValueError('Image must be same dimensions as display ({0}x{1}).'.format(
+                self.disp.width, self.disp.height))
+        return self.push(self.disp.frame_pool.encode(Image))
+
+    def push(self, pix, origin = (0, 0)):
+        """Send the changed parts of an RGB565 block placed at origin.
+
+        Returns the list of boxes written, in screen coordinates.
+        """
+        self._follow_orientation()
+        x, y = origin
+        h, w = pix.shape
+        self.frames += 1
+        if self.last is None:
+            if (x, y, w, h) != (0, 0, self.disp.width, self.disp.height):
+                raise ValueError('First frame after invalidate() must cover the whole screen')
+            self.last = pix.copy()
+            boxes = [(0, 0, w, h)]
+        else:
+            old = self.last[y:y+h, x:x+w]
+            boxes = [(x0 + x, y0 + y, x1 + x, y1 + y) for x0, y0, x1, y1 in changed_boxes(old, pix, self.gap, self._diff[:h, :w])]
+            old[...] = pix
+        for Xstart, Ystart, Xend, Yend in boxes:
+            self.disp.write_region(pix[Ystart-y:Yend-y, Xstart-x:Xend-x], (Xstart, Ystart, Xend, Yend))
+            self.pixel_bytes += (Xend - Xstart) * (Yend - Ystart) * 2
+        self.regions += len(boxes)
+        return boxes
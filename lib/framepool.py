@@ -0,0 +1,66 @@
+import numpy as np
+from PIL import Image
+
+from .lcdconfig import palette_index, palette_lut, palette_to_rgb565, rgb888_to_rgb565
+
+# distinct palettes whose LUTs are kept; a canvas palette only grows while
+# its colours are first used, so a few entries cover a whole UI
+MAX_LUTS = 16
+
+
+class FramePool:
+    """Canvases and RGB565 buffers of one display, allocated once and reused.
+
+    encode() returns a view valid until the next encode() of the same size.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._canvases = {}
+        self._buffers = {}
+        self._luts = {}
+
+    def canvas(self, key, background = "BLACK", size = None, mode = None):
+        """Pooled image for key; mode defaults to the background image's, RGB for a colour"""
+        is_image = isinstance(background, Image.Image)
+        if size is None:
+            size = background.size if is_image else (self.width, self.height)
+        if mode is None:
+            mode = background.mode if is_image else "RGB"
+        image = self._canvases.get(key)
+        if image is None or image.size != size or image.mode != mode:
+            image = self._canvases[key] = Image.new(mode, size)
+        if is_image:
+            if mode == "P" and background.mode == "P":
+                image.putpalette(background.getpalette())
+            image.paste(background, (0, 0))
+        else:
+            if mode == "P":
+                background = palette_index(image, background)
+            image.paste(background, (0, 0) + size)
+        return image
+
+    def buffers(self, shape):
+        """(out, scratch) uint16 arrays of shape (height, width)"""
+        bufs = self._buffers.get(shape)
+        if bufs is None:
+            bufs = self._buffers[shape] = (np.empty(shape, dtype = np.uint16), np.empty(shape, dtype = np.uint16))
+        return bufs
+
+    def lut(self, image):
+        """RGB565 table of a mode "P" image's palette, built once per distinct palette"""
+        palette = bytes(image.getpalette() or ())
+        lut = self._luts.get(palette)
+        if lut is None:
+            if len(self._luts) >= MAX_LUTS:
+                self._luts.clear()
+            lut = self._luts[palette] = palette_lut(palette)
+        return lut
+
+    def encode(self, image):
+        """Big-endian RGB565 view of a PIL image (or HxWx3 array) in the pooled buffer for its size"""
+        shape = (image.height, image.width) if hasattr(image, "height") else image.shape[:2]
+        if getattr(image, "mode", None) == "P":
+            return palette_to_rgb565(image, self.lut(image), self.buffers(shape)[0].view(">u2"))
+        return rgb888_to_rgb565(image, *self.buffers(shape))
@@ -0,0 +1,127 @@
+import mmap
+import os
+
+# BCM2835..BCM2711 GPIO block (Pi 1-4), as 32-bit register indexes
+GPFSEL0 = 0x00 // 4
+GPSET0 = 0x1C // 4
+GPCLR0 = 0x28 // 4
+GPLEV0 = 0x34 // 4
+BLOCK_SIZE = 4096
+
+BACKENDS = ("gpiozero", "lgpio", "gpiomem", "sim")
+
+
+class RegisterPin:
+    """Output pin driven by writing its bit into GPSETn / GPCLRn"""
+
+    __slots__ = ("pin", "value", "_regs", "_mask", "_set", "_clr", "_owner")
+
+    def __init__(self, owner, pin):
+        self.pin = pin
+        self.value = 0
+        self._owner = owner
+        self._regs = owner.regs
+        self._mask = 1 << (pin % 32)
+        self._set = GPSET0 + pin // 32
+        self._clr = GPCLR0 + pin // 32
+
+    def on(self):
+        self._regs[self._set] = self._mask
+        self.value = 1
+
+    def off(self):
+        self._regs[self._clr] = self._mask
+        self.value = 0
+
+    def close(self):
+        self._owner.set_function(self.pin, 0)
+
+
+class RegisterGpio:
+    """Direct register access to the GPIO block through a 4 KiB buffer.
+
+    regs is the mapped /dev/gpiomem (see open_gpiomem), or any writable
+    buffer of BLOCK_SIZE bytes for the simulated backend: the same code
+    path then writes into plain memory.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        self.regs = memoryview(buf).cast("I")
+
+    def set_function(self, pin, function):
+        """GPFSELn: 0 = input, 1 = output"""
+        reg = GPFSEL0 + pin // 10
+        shift = (pin % 10) * 3
+        self.regs[reg] = (self.regs[reg] & ~(7 << shift)) | (function << shift)
+
+    def output(self, pin):
+        self.regs[GPCLR0 + pin // 32] = 1 << (pin % 32)
+        self.set_function(pin, 1)
+        return RegisterPin(self, pin)
+
+    def close(self):
+        self.regs.release()
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+
+class LgpioPin:
+    __slots__ = ("pin", "value", "_handle", "_write", "_free")
+
+    def __init__(self, lgpio, handle, pin):
+        lgpio.gpio_claim_output(handle, pin, 0)
+        self.pin = pin
+        self.value = 0
+        self._handle = handle
+        self._write = lgpio.gpio_write
+        self._free = lgpio.gpio_free
+
+    def on(self):
+        self._write(self._handle, self.pin, 1)
+        self.value = 1
+
+    def off(self):
+        self._write(self._handle, self.pin, 0)
+        self.value = 0
+
+    def close(self):
+        self._free(self._handle, self.pin)
+
+
+class LgpioGpio:
+    """Output pins through lgpio (/dev/gpiochipN), also on the Pi 5"""
+
+    def __init__(self, chip = 0):
+        import lgpio
+        self._lgpio = lgpio
+        self.handle = lgpio.gpiochip_open(chip)
+
+    def output(self, pin):
+        return LgpioPin(self._lgpio, self.handle, pin)
+
+    def close(self):
+        self._lgpio.gpiochip_close(self.handle)
+
+
+def open_gpiomem(path = "/dev/gpiomem"):
+    """RegisterGpio on the mapped GPIO block; no root needed, Pi 1-4 only"""
+    fd = os.open(path, os.O_RDWR | os.O_SYNC)
+    try:
+        buf = mmap.mmap(fd, BLOCK_SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+    finally:
+        os.close(fd)
+    return RegisterGpio(buf)
+
+
+def open_backend(name):
+    """Output pin backend by name; None for "gpiozero" (the default pins)"""
+    if name == "gpiozero":
+        return None
+    if name == "lgpio":
+        return LgpioGpio()
+    if name == "gpiomem":
+        return open_gpiomem()
+    if name == "sim":
+        return RegisterGpio(bytearray(BLOCK_SIZE))
+    raise ValueError("unknown GPIO backend {!r}, expected one of {}".format(name, ", ".join(BACKENDS)))
@@ -30,32 +30,262 @@
 import os
 import sys
 import time
-import spidev
 import logging
-import numpy as np
-from gpiozero import *
+
+from . import gpio as gpio_backends
+
+SPI_CHUNK = 4096
+# pixels per palette gather, 64 KiB of intp indices
+LUT_CHUNK = 8192
+
+# MADCTL (0x36) bits: row / column address order, row-column exchange
+MADCTL_MY = 0x80
+MADCTL_MX = 0x40
+MADCTL_MV = 0x20
+ORIENTATIONS = (0, 90, 180, 270)
+
+def color_to_rgb565(color):
+    """RGB565 value of a colour given as an int (already RGB565) or any PIL colour"""
+    if isinstance(color, int):
+        return color & 0xFFFF
+    from PIL import ImageColor
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+
+def rgb888_to_rgb565(Image, out = None, scratch = None):
+    """Pack a PIL image (or HxWx3 uint8 array) into a big-endian RGB565 array.
+
+    The result has shape (height, width) and dtype '>u2', so its raw memory is
+    exactly the byte stream the panels expect after RAMWR (0x2C).
+
+    out and scratch are optional native uint16 (height, width) arrays for the
+    result and the intermediate channel; all the arithmetic is done in place
+    in them, and the result is then a '>u2' view of out.
+    """
+    import numpy as np
+    if hasattr(Image, "mode") and Image.mode != "RGB":
+        Image = Image.convert("RGB")
+    img = np.asarray(Image)
+    if out is None:
+        out = np.empty(img.shape[:2], dtype = np.uint16)
+    if scratch is None:
+        scratch = np.empty(img.shape[:2], dtype = np.uint16)
+    np.copyto(out, img[..., 0])
+    out &= 0xF8
+    out <<= 8
+    np.copyto(scratch, img[..., 1])
+    scratch &= 0xFC
+    scratch <<= 3
+    out |= scratch
+    np.copyto(scratch, img[..., 2])
+    scratch >>= 3
+    out |= scratch
+    if sys.byteorder == "little":
+        out.byteswap(inplace = True)
+    return out.view(">u2")
+
+def palette_index(Image, color):
+    """Index of a colour in the palette of a mode "P" image, added to it if new"""
+    if isinstance(color, int):
+        return color
+    from PIL import ImageColor
+    return Image.palette.getcolor(ImageColor.getrgb(color)[:3], Image)
+
+def palette_lut(palette):
+    """256-entry big-endian RGB565 table of a flat [r, g, b, ...] palette; unused entries are black"""
+    import numpy as np
+    rgb = np.zeros(768, dtype = np.uint16)
+    pal = np.frombuffer(bytes(palette), dtype = np.uint8)[:768]
+    rgb[:pal.size] = pal
+    r, g, b = rgb[0::3], rgb[1::3], rgb[2::3]
+    return (((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)).astype(">u2")
+
+def palette_to_rgb565(Image, lut = None, out = None):
+    """Big-endian RGB565 array of a mode "P" image, one gather through a LUT.
+
+    The 8-bit indices are looked up in lut (palette_lut of the image's own
+    palette if not given); out is an optional contiguous '>u2' (height,
+    width) array for the result. numpy widens the indices of a gather to
+    intp, so it is done LUT_CHUNK pixels at a time to keep that temporary
+    small.
+    """
+    import numpy as np
+    if lut is None:
+        lut = palette_lut(Image.getpalette() or ())
+    idx = np.asarray(Image)
+    if out is None:
+        out = np.empty(idx.shape, dtype = ">u2")
+    flat_idx, flat_out = idx.reshape(-1), out.reshape(-1)
+    for i in range(0, flat_idx.size, LUT_CHUNK):
+        np.take(lut, flat_idx[i:i+LUT_CHUNK], out = flat_out[i:i+LUT_CHUNK], mode = "clip")
+    return out
 
 class RaspberryPi:
-    def __init__(self,spi=spidev.SpiDev(0,0),spi_freq=40000000,rst = 27,dc = 25,bl = 18,bl_freq=1000,i2c=None,i2c_freq=100000):
+    # Panel geometry, set by every driver: controller RAM as (columns, rows)
+    # and the visible area in it as (x, y, width, height), both for MADCTL 0,
+    # and the MADCTL value that gives the driver's width x height (orientation 0)
+    GRAM = (240, 320)
+    PANEL = (0, 0, 240, 320)
+    MADCTL = 0x00
+
+    def __init__(self,spi=(0,0),spi_freq=40000000,rst = 27,dc = 25,bl = 18,bl_freq=1000,i2c=None,i2c_freq=100000,gpio="gpiozero",orientation=0):
+        import numpy as np
         self.np=np
         self.INPUT = False
         self.OUTPUT = True
 
         self.SPEED  =spi_freq
         self.BL_freq=bl_freq
+        self._fill_cache = {}
+        self._frame_pool = None
+        self._dc = None
+        self._caset = None
+        self._raset = None
+        self._madctl = None
+        self.set_madctl(self.madctl_for(orientation), send = False)
 
+        #DC/RST output pins: a name from gpio.BACKENDS or a backend object; the backlight PWM stays on gpiozero
+        self.gpio = gpio_backends.open_backend(gpio) if isinstance(gpio, str) else gpio
         self.RST_PIN= self.gpio_mode(rst,self.OUTPUT)
         self.DC_PIN = self.gpio_mode(dc,self.OUTPUT)
         self.BL_PIN = self.gpio_pwm(bl)
         self.bl_DutyCycle(0)
         
-        #Initialize SPI
+        #Initialize SPI; a (bus, device) tuple opens spidev, anything else is used as is
+        if isinstance(spi, tuple):
+            import spidev
+            spi = spidev.SpiDev(*spi)
         self.SPI = spi
         if self.SPI!=None :
             self.SPI.max_speed_hz = spi_freq
             self.SPI.mode = 0b00
 
+    def image_to_rgb565(self, Image):
+        if getattr(Image, "mode", None) == "P":
+            return palette_to_rgb565(Image)
+        return rgb888_to_rgb565(Image)
+
+    @property
+    def frame_pool(self):
+        """This display's framepool.FramePool, created on first use"""
+        if self._frame_pool is None:
+            from .framepool import FramePool
+            self._frame_pool = FramePool(self.width, self.height)
+        return self._frame_pool
+
+    def fill_buffer(self, color = 0xFFFF):
+        """Full-screen RGB565 buffer of one colour, encoded once and then reused"""
+        value = color_to_rgb565(color)
+        buf = self._fill_cache.get(value)
+        if buf is None:
+            buf = self.np.full(self.width * self.height, value, dtype = ">u2")
+            buf.flags.writeable = False
+            self._fill_cache[value] = buf
+        return buf
+
+    def ShowRegion(self, Image, box):
+        """Write only box = (Xstart, Ystart, Xend, Yend) of the screen, ends exclusive.
+
+        Image is either a full-screen image (the box is cropped out of it) or
+        an image exactly the size of the box.
+        """
+        Xstart, Ystart, Xend, Yend = box
+        if Image.size != (Xend - Xstart, Yend - Ystart):
+            Image = Image.crop(box)
+        self.write_region(self.frame_pool.encode(Image), box)
+
+    def madctl_for(self, orientation):
+        """MADCTL value that shows the picture turned by orientation (0/90/180/270) from orientation 0"""
+        if orientation not in ORIENTATIONS:
+            raise ValueError("orientation must be one of {}".format(ORIENTATIONS))
+        value = self.MADCTL
+        for _ in range(orientation // 90):
+            # one quarter turn: exchange rows and columns, then mirror the new column order
+            if value & MADCTL_MV:
+                value ^= MADCTL_MV | MADCTL_MY
+            else:
+                value ^= MADCTL_MV | MADCTL_MX
+        return value
+
+    def set_orientation(self, orientation):
+        """Turn the picture by 0/90/180/270 degrees in the controller (no pixel is moved in memory).
+
+        width and height follow; a FrameDiff made before must be recreated.
+        """
+        self.set_madctl(self.madctl_for(orientation))
+
+    def set_madctl(self, value, send = True):
+        """Use this MADCTL value: width, height and window offsets follow it.
+
+        0x36 is only written when the panel holds a different value
+        (run_sequence notes the one an init sequence sends).
+        """
+        gram_w, gram_h = self.GRAM
+        x, y, w, h = self.PANEL
+        if value & MADCTL_MX:
+            x = gram_w - w - x
+        if value & MADCTL_MY:
+            y = gram_h - h - y
+        if value & MADCTL_MV:
+            x, y, w, h = y, x, h, w
+        self.madctl = value
+        self.width, self.height = w, h
+        self._offset = (x, y)
+        self.orientation = next((o for o in ORIENTATIONS if self.madctl_for(o) == value), None)
+        if self._frame_pool is not None:
+            self._frame_pool.width, self._frame_pool.height = w, h
+        if send and value != self._madctl:
+            self.send(0x36, (value,))
+            self._madctl = value
+
+    def SetWindows(self, Xstart, Ystart, Xend, Yend):
+        """Address window (ends exclusive) in the current orientation, then RAMWR"""
+        x, y = self._offset
+        Xstart += x
+        Xend += x - 1
+        Ystart += y
+        Yend += y - 1
+        self.set_window((Xstart >> 8, Xstart & 0xff, Xend >> 8, Xend & 0xff),
+                        (Ystart >> 8, Ystart & 0xff, Yend >> 8, Yend & 0xff))
+
+    def ShowImage(self, Image):
+        """Write a full-screen PIL image.
+
+        An image with width and height swapped turns the panel by 90 degrees
+        first (0 <-> 90, 180 <-> 270), so portrait and landscape frames are
+        both sent as they are.
+        """
+        if Image is None:
+            return
+        size = Image.size
+        if size != (self.width, self.height):
+            if size != (self.height, self.width) or self.orientation is None:
+                raise ValueError('Image must be same dimensions as display \
+                    ({0}x{1}).' .format(self.width, self.height))
+            self.set_orientation(self.orientation + 90 if self.orientation in (0, 180) else self.orientation - 90)
+        pix = self.frame_pool.encode(Image)
+        self.SetWindows(0, 0, self.width, self.height)
+        self.digital_write(self.DC_PIN,True)
+        self.spi_writebuffer(pix)
+
+    def clear(self, color = 0xFFFF):
+        """Fill the screen with one colour (RGB565 int or PIL colour name)"""
+        _buffer = self.fill_buffer(color)
+        self.SetWindows(0, 0, self.width, self.height)
+        self.digital_write(self.DC_PIN,True)
+        self.spi_writebuffer(_buffer)
+
+    def write_region(self, pix, box):
+        """Send an already encoded RGB565 block (see rgb888_to_rgb565) into box"""
+        Xstart, Ystart, Xend, Yend = box
+        self.SetWindows(Xstart, Ystart, Xend, Yend)
+        self.digital_write(self.DC_PIN,True)
+        self.spi_writebuffer(self.np.ascontiguousarray(pix))
+
     def gpio_mode(self,Pin,Mode,pull_up = None,active_state = True):
+        if Mode and self.gpio is not None:
+            return self.gpio.output(Pin)
+        from gpiozero import DigitalOutputDevice, DigitalInputDevice
         if Mode:
             return DigitalOutputDevice(Pin,active_high = True,initial_value =False)
         else:
@@ -66,6 +296,59 @@ class RaspberryPi:
             Pin.on()
         else:
             Pin.off()
+        if Pin is self.DC_PIN:
+            self._dc = bool(value)
+
+    def set_dc(self, value):
+        """Drive DC only if it is not already at that level"""
+        if self._dc != bool(value):
+            self.digital_write(self.DC_PIN, value)
+
+    def command(self, cmd):
+        self.set_dc(False)
+        self.spi_writebyte([cmd])
+
+    def data(self, val):
+        self.set_dc(True)
+        self.spi_writebyte([val])
+
+    def send(self, cmd, params = ()):
+        """One command byte, then all its parameter bytes in a single SPI write"""
+        self.set_dc(False)
+        self.spi_writebyte([cmd])
+        if params:
+            self.set_dc(True)
+            self.spi_writebyte(list(params))
+
+    def run_sequence(self, sequence):
+        """Send a table of (cmd, params, delay_ms) entries, e.g. a panel init sequence"""
+        self.invalidate_window()
+        for cmd, params, delay in sequence:
+            self.send(cmd, params)
+            if cmd == 0x36:
+                self._madctl = params[0]
+            if delay:
+                self.delay_ms(delay)
+
+    def set_window(self, caset, raset):
+        """CASET/RASET parameters (tuples of 4 bytes) then RAMWR.
+
+        The panel keeps its address window, so a range equal to the last
+        one sent is skipped; only RAMWR, which restarts the write pointer,
+        goes out every time.
+        """
+        if caset != self._caset:
+            self.send(0x2A, caset)
+            self._caset = caset
+        if raset != self._raset:
+            self.send(0x2B, raset)
+            self._raset = raset
+        self.send(0x2C)
+
+    def invalidate_window(self):
+        """Forget the window the panel holds (after a reset or a raw CASET/RASET)"""
+        self._caset = None
+        self._raset = None
 
     def digital_read(self, Pin):
         return Pin.value
@@ -74,12 +357,23 @@ class RaspberryPi:
         time.sleep(delaytime / 1000.0)
 
     def gpio_pwm(self,Pin):
+        from gpiozero import PWMOutputDevice
         return PWMOutputDevice(Pin,frequency = self.BL_freq)
 
     def spi_writebyte(self, data):
         if self.SPI!=None :
             self.SPI.writebytes(data)
 
+    def spi_writebuffer(self, buf):
+        """Stream a contiguous buffer (bytes, bytearray, ndarray) without building a list"""
+        if self.SPI!=None :
+            data = memoryview(self.np.frombuffer(buf, dtype = self.np.uint8))
+            if hasattr(self.SPI, "writebytes2"):
+                self.SPI.writebytes2(data)
+            else:
+                for i in range(0, len(data), SPI_CHUNK):
+                    self.SPI.writebytes(data[i:i+SPI_CHUNK].tolist())
+
     def bl_DutyCycle(self, duty):
         self.BL_PIN.value = duty / 100
         
@@ -87,6 +381,9 @@ class RaspberryPi:
         self.BL_PIN.frequency = freq
            
     def module_init(self):
+        self._dc = None
+        self._madctl = None
+        self.invalidate_window()
         if self.SPI!=None :
             self.SPI.max_speed_hz = self.SPEED        
             self.SPI.mode = 0b00     
@@ -101,6 +398,13 @@ class RaspberryPi:
         self.digital_write(self.RST_PIN, 1)
         self.digital_write(self.DC_PIN, 0)   
         self.BL_PIN.close()
+        # release the pins and the backend (lgpio chip handle, gpiomem
+        # mapping) so the display can be opened again in this process
+        self.RST_PIN.close()
+        self.DC_PIN.close()
+        if self.gpio is not None:
+            self.gpio.close()
+            self.gpio = None
         time.sleep(0.001)
 
 
@@ -0,0 +1,203 @@
+import math
+
+import numpy as np
+
+
+class _MonoQueue:
+    """Monotonic queue of sample numbers over a ring of values (sliding min or max).
+
+    Lives in a fixed int64 array; push and evict are amortised O(1), top()
+    is O(1).
+    """
+
+    def __init__(self, values, capacity, largest):
+        self.values = values
+        self.ring = len(values)
+        self.q = np.zeros(capacity + 1, dtype = np.int64)
+        self.size = capacity + 1
+        self.head = 0
+        self.tail = 0
+        self.largest = largest
+
+    def push(self, seq, value):
+        q, values, ring, size = self.q, self.values, self.ring, self.size
+        while self.tail > self.head:
+            last = values[q[(self.tail - 1) % size] % ring]
+            if (last > value) if self.largest else (last < value):
+                break
+            self.tail -= 1
+        q[self.tail % self.size] = seq
+        self.tail += 1
+
+    def evict(self, start):
+        while self.head < self.tail and self.q[self.head % self.size] < start:
+            self.head += 1
+
+    def top(self):
+        if self.head == self.tail:
+            return math.nan
+        return float(self.values[self.q[self.head % self.size] % self.ring])
+
+
+class _Window:
+    """Aggregates of one field over the samples of the last `seconds`"""
+
+    def __init__(self, seconds, field, values, bins, capacity):
+        self.seconds = seconds
+        self.field = field
+        self.values = values
+        self.start = 0
+        self.sum = 0.0
+        self.count = 0
+        self.hist = np.zeros(bins, dtype = np.int64)
+        self.max = _MonoQueue(values, capacity, True)
+        self.min = _MonoQueue(values, capacity, False)
+
+
+class SampleRing:
+    """Last `capacity` samples of a few float fields, with O(1) aggregates.
+
+    Samples live in preallocated numpy arrays; nothing is allocated per
+    sample. For every field and every window (seconds, plus None for the
+    whole buffer) a running sum, sliding min/max (monotonic queues) and a
+    log-spaced histogram are updated on push(), so mean(), min(), max(),
+    count() are O(1) and percentile() is O(bins). ewma() is a plain
+    exponentially weighted average over all samples.
+
+    Percentiles are approximate: the geometric middle of the histogram bin,
+    with bins spaced evenly in log between hist_range; values at or below 0
+    go to the first bin.
+
+        ring = SampleRing(3600, ("uva", "uvb"), windows = (60, 900))
+        ring.push(time.monotonic(), uva, uvb)
+        ring.max("uvb", 60)
+    """
+
+    def __init__(self, capacity, fields, windows = (), alpha = 0.1, hist_range = (0.1, 1e6), bins = 128):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.alpha = alpha
+        self.seq = 0
+        self.t = np.zeros(capacity, dtype = np.float64)
+        self.data = np.zeros((len(self.fields), capacity), dtype = np.float64)
+        self.bin = np.zeros((len(self.fields), capacity), dtype = np.int16)
+        self._ewma = [math.nan] * len(self.fields)
+        self._index = {name: i for i, name in enumerate(self.fields)}
+
+        self.bins = bins
+        lo, hi = hist_range
+        self._log_lo = math.log(lo)
+        self._log_step = (math.log(hi) - self._log_lo) / (bins - 2)
+        self.windows = (None,) + tuple(windows)
+        self._windows = {
+            w: [_Window(w, i, self.data[i], bins, capacity) for i in range(len(self.fields))]
+            for w in self.windows
+        }
+
+    def __len__(self):
+        return min(self.seq, self.capacity)
+
+    def _bin(self, value):
+        if not value > 0:
+            return 0
+        return min(self.bins - 1, max(1, int((math.log(value) - self._log_lo) / self._log_step) + 1))
+
+    def _bin_value(self, b):
+        """Representative value of histogram bin b"""
+        if b == 0:
+            return 0.0
+        return math.exp(self._log_lo + (b - 0.5) * self._log_step)
+
+    def _evict(self, window, start):
+        """Drop samples older than sample number start from one field window"""
+        bins = self.bin[window.field]
+        while window.start < start:
+            slot = window.start % self.capacity
+            window.sum -= window.values[slot]
+            window.count -= 1
+            window.hist[bins[slot]] -= 1
+            window.start += 1
+        window.max.evict(start)
+        window.min.evict(start)
+
+    def push(self, t, *values):
+        """Add one sample taken at time t (seconds, non-decreasing), one value per field"""
+        seq = self.seq
+        slot = seq % self.capacity
+        oldest = seq - self.capacity + 1
+        for per_field in self._windows.values():
+            for window in per_field:
+                if window.start < oldest:
+                    self._evict(window, oldest)
+
+        self.t[slot] = t
+        for i, value in enumerate(values):
+            value = float(value)
+            self.data[i, slot] = value
+            b = self._bin(value)
+            self.bin[i, slot] = b
+            prev = self._ewma[i]
+            self._ewma[i] = value if prev != prev else prev + self.alpha * (value - prev)
+            for per_field in self._windows.values():
+                window = per_field[i]
+                window.sum += value
+                window.count += 1
+                window.hist[b] += 1
+                window.max.push(seq, value)
+                window.min.push(seq, value)
+        self.seq = seq + 1
+
+        # time windows: drop what fell out of the last `seconds`
+        t_of = self.t
+        for w in self.windows[1:]:
+            per_field = self._windows[w]
+            first = per_field[0]
+            start = first.start
+            while start < seq and t_of[start % self.capacity] < t - w:
+                start += 1
+            if start != first.start:
+                for window in per_field:
+                    self._evict(window, start)
+
+    def _window(self, field, window):
+        return self._windows[window][self._index[field]]
+
+    def count(self, window = None):
+        return self._windows[window][0].count
+
+    def last(self, field):
+        if not self.seq:
+            return math.nan
+        return float(self.data[self._index[field], (self.seq - 1) % self.capacity])
+
+    def mean(self, field, window = None):
+        w = self._window(field, window)
+        return w.sum / w.count if w.count else math.nan
+
+    def max(self, field, window = None):
+        return self._window(field, window).max.top()
+
+    def min(self, field, window = None):
+        return self._window(field, window).min.top()
+
+    def ewma(self, field):
+        return self._ewma[self._index[field]]
+
+    def percentile(self, field, q, window = None):
+        """Approximate q-quantile (0..1) of field over the window"""
+        w = self._window(field, window)
+        if not w.count:
+            return math.nan
+        rank = max(1, math.ceil(q * w.count))
+        b = int(np.searchsorted(np.cumsum(w.hist), rank))
+        return self._bin_value(b)
+
+    def values(self, field, window = None):
+        """Copy of the field over the window, oldest first (for trend plots)"""
+        start = self._windows[window][0].start
+        idx = np.arange(start, self.seq) % self.capacity
+        return self.data[self._index[field], idx]
+
+    def times(self, window = None):
+        start = self._windows[window][0].start
+        return self.t[np.arange(start, self.seq) % self.capacity]
@@ -0,0 +1,162 @@
+import heapq
+import logging
+import threading
+import time
+
+from . import autorange
+from .as7331 import AS7331, GAIN_LEVELS, MMODE_CMD, STATUS_ADCOF, TIME_STEPS
+
+
+class SensorState:
+    """One AS7331: where it is, its auto-ranging and its counters; the range is the chip's"""
+
+    def __init__(self, bus_id, chip):
+        self.bus_id = bus_id
+        self.chip = chip
+        self.addr = chip.addr
+        self.name = "{}:0x{:02X}".format(bus_id, chip.addr)
+        self.auto_range = autorange.AutoRange(GAIN_LEVELS, [1 << c for c in TIME_STEPS])
+        self.ready_at = 0.0
+        self.samples = 0
+        self.errors = 0
+        self.last = None
+        self.first_sample = None
+        self.last_sample = None
+
+    @property
+    def gain_index(self):
+        return self.chip.gain_index
+
+    @property
+    def time_idx(self):
+        return TIME_STEPS.index(self.chip.time_code)
+
+    @property
+    def gain(self):
+        return self.chip.gain
+
+    @property
+    def time_ms(self):
+        return self.chip.time_ms
+
+    def throughput(self):
+        """Samples per second since the first sample"""
+        if self.samples < 2:
+            return 0.0
+        return (self.samples - 1) / (self.last_sample - self.first_sample)
+
+
+class SensorManager:
+    """Several AS7331 on one or more I2C buses, measuring at the same time.
+
+    Every sensor runs in CMD mode: start a conversion, let it integrate,
+    read the result in one burst, re-range and start the next one. One
+    thread per bus walks its sensors in order of their conversion deadline,
+    so all sensors integrate in parallel and only the short register
+    transfers take turns on the bus; buses run independently. Each bus
+    also has a lock, to share it with other code safely.
+
+    on_sample(sensor, measurement, gain, time_ms) is called from the bus
+    thread with the range the sample was taken in.
+    """
+
+    def __init__(self, buses, on_sample = None):
+        self.buses = dict(buses)
+        self.locks = {bus_id: threading.Lock() for bus_id in self.buses}
+        self.sensors = []
+        self.on_sample = on_sample
+        self._stop = threading.Event()
+        self._threads = []
+
+    def add(self, bus_id, addr):
+        sensor = SensorState(bus_id, AS7331(self.buses[bus_id], addr))
+        self.sensors.append(sensor)
+        return sensor
+
+    def start(self):
+        self._stop.clear()
+        for bus_id in self.buses:
+            sensors = [s for s in self.sensors if s.bus_id == bus_id]
+            if not sensors:
+                continue
+            thread = threading.Thread(target = self._run_bus, args = (bus_id, sensors),
+                                      name = "as7331-bus{}".format(bus_id), daemon = True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout = 2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def throughput(self):
+        """Samples per second per sensor name, plus "total" """
+        rates = {s.name: s.throughput() for s in self.sensors}
+        rates["total"] = sum(rates.values())
+        return rates
+
+    # bus thread
+
+    def _start(self, sensor):
+        sensor.chip.start()
+        sensor.ready_at = time.monotonic() + sensor.time_ms / 1000.0
+
+    def _run_bus(self, bus_id, sensors):
+        lock = self.locks[bus_id]
+        queue = []
+        for i, sensor in enumerate(sensors):
+            try:
+                with lock:
+                    sensor.chip.reset()
+                    sensor.chip.configure(mmode = MMODE_CMD)
+                    self._start(sensor)
+            except OSError:
+                sensor.errors += 1
+                logging.exception("AS7331 %s: init failed", sensor.name)
+                continue
+            heapq.heappush(queue, (sensor.ready_at, i, sensor))
+
+        while queue and not self._stop.is_set():
+            ready_at, i, sensor = heapq.heappop(queue)
+            wait = ready_at - time.monotonic()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            sample = None
+            try:
+                with lock:
+                    m = sensor.chip.read()
+                    if not m.ready:
+                        # conversion not finished yet (clock skew): look again shortly
+                        sensor.ready_at = time.monotonic() + 0.001
+                    else:
+                        sample = self._sample(sensor, m)
+            except OSError:
+                sensor.errors += 1
+                sensor.ready_at = time.monotonic() + 0.01
+            heapq.heappush(queue, (sensor.ready_at, i, sensor))
+
+            if sample is not None and self.on_sample is not None:
+                try:
+                    self.on_sample(sensor, m, *sample)
+                except Exception:
+                    logging.exception("AS7331 %s: on_sample failed", sensor.name)
+
+    def _sample(self, sensor, m):
+        """Count the sample, re-range and start the next conversion; returns its (gain, time_ms)"""
+        gain, time_ms = sensor.gain, sensor.time_ms
+        now = time.monotonic()
+        sensor.samples += 1
+        sensor.last = m
+        sensor.last_sample = now
+        if sensor.first_sample is None:
+            sensor.first_sample = now
+
+        raw_ref = max(m.uva, m.uvb)
+        new_range = sensor.auto_range.update(raw_ref, bool(m.status & STATUS_ADCOF),
+                                             sensor.gain_index, sensor.time_idx)
+        if new_range is not None:
+            gain_index, time_idx = new_range
+            sensor.chip.configure(gain_index, TIME_STEPS[time_idx])
+        self._start(sensor)
+        return gain, time_ms
@@ -0,0 +1,307 @@
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from . import as7331
+
+
+class SimSMBus:
+    """smbus2.SMBus stand-in that routes transfers to simulated devices by address.
+
+    Counts transactions and bytes so bus traffic can be compared between
+    code paths. Unknown addresses raise OSError like a missing ACK. With
+    byte_us > 0 every transfer holds the bus for (bytes + 1) * byte_us
+    (about 90 us per byte at 100 kHz, 23 us at 400 kHz), serialised like a
+    real adapter.
+    """
+
+    def __init__(self, devices = None, byte_us = 0.0):
+        self.devices = dict(devices or {})
+        self.byte_us = byte_us
+        self.transactions = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def _hold(self, nbytes):
+        if self.byte_us:
+            with self._lock:
+                time.sleep((nbytes + 1) * self.byte_us / 1e6)
+
+    def _device(self, addr):
+        dev = self.devices.get(addr)
+        if dev is None:
+            raise OSError(121, "Remote I/O error (no device at 0x{:02X})".format(addr))
+        return dev
+
+    def write_byte_data(self, i2c_addr, register, value, force = None):
+        self.transactions += 1
+        self.bytes += 2
+        self._hold(2)
+        self._device(i2c_addr).write(register, [value])
+
+    def write_i2c_block_data(self, i2c_addr, register, data, force = None):
+        self.transactions += 1
+        self.bytes += 1 + len(data)
+        self._hold(1 + len(data))
+        self._device(i2c_addr).write(register, list(data))
+
+    def read_byte_data(self, i2c_addr, register, force = None):
+        return self.read_i2c_block_data(i2c_addr, register, 1)[0]
+
+    def read_i2c_block_data(self, i2c_addr, register, length, force = None):
+        self.transactions += 1
+        self.bytes += 1 + length
+        self._hold(1 + length)
+        return self._device(i2c_addr).read(register, length)
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """Combined transfer: a register write followed by reads/writes (repeated start)"""
+        self.transactions += 1
+        self._hold(sum(msg.len for msg in i2c_msgs))
+        register = None
+        for msg in i2c_msgs:
+            dev = self._device(msg.addr)
+            self.bytes += msg.len
+            if msg.flags & 0x0001:
+                data = dev.read(register or 0, msg.len)
+                for i, b in enumerate(data):
+                    msg.buf[i] = bytes([b])
+            else:
+                payload = list(msg)
+                register = payload[0]
+                if len(payload) > 1:
+                    dev.write(register, payload[1:])
+
+    def close(self):
+        pass
+
+
+class SimAS7331:
+    """Register-level AS7331 model.
+
+    light is (uva, uvb, uvc) in counts at gain 1x and 1 ms, or a callable
+    light(t) returning that tuple for time-varying scenarios. Counts scale
+    with gain x integration time and clip at 65535 with ADCOF set.
+    Conversions take the programmed integration time on the real clock;
+    CMD and CONT measurement modes are modelled.
+    """
+
+    def __init__(self, light = (5.0, 1.0, 0.2), temp_c = 25.0, clock = time.monotonic):
+        self.light = light
+        self.temp_c = temp_c
+        self.clock = clock
+        self.config = bytearray(16)
+        self.config[as7331.CREG1] = 0xA6
+        self.config[as7331.CREG2] = as7331.CREG2_RESET
+        self.config[as7331.CREG3] = as7331.MMODE_CMD
+        self.osr = 0x42
+        self.results = [0, 0, 0]
+        self.status = 0
+        self.conv_start = None
+        self.conv_end = None
+        self.conv_ms = 0
+        self.delivered = 0
+        self.writes = Counter()
+
+    # configuration helpers
+
+    @property
+    def gain(self):
+        return 1 << (11 - (self.config[as7331.CREG1] >> 4))
+
+    @property
+    def time_ms(self):
+        return 1 << (self.config[as7331.CREG1] & 0x0F)
+
+    @property
+    def mmode(self):
+        return self.config[as7331.CREG3] & 0xC0
+
+    def _levels(self, t):
+        return self.light(t) if callable(self.light) else self.light
+
+    # conversions
+
+    def _period(self):
+        return (self.conv_ms + self.config[as7331.BREAK] * 0.008) / 1000.0
+
+    def _completed(self, now):
+        """Number of conversions finished since the measurement was started"""
+        if self.conv_start is None:
+            return 0
+        if self.mmode == as7331.MMODE_CONT:
+            return int((now - self.conv_start) // self._period()) if now >= self.conv_end else 0
+        return 1 if now >= self.conv_end else 0
+
+    def _update(self):
+        now = self.clock()
+        done = self._completed(now)
+        if done > self.delivered:
+            if done - self.delivered > 1 or self.status & as7331.STATUS_NDATA:
+                self.status |= as7331.STATUS_LDATA
+            self.status |= as7331.STATUS_NDATA
+            self.delivered = done
+            self._convert(now)
+        if done:
+            # NOTREADY is set from the start until the first conversion ends
+            self.status &= ~as7331.STATUS_NOTREADY
+
+    def _convert(self, now):
+        exposure = self.gain * self.conv_ms
+        self.status &= ~as7331.STATUS_ADCOF
+        for i, level in enumerate(self._levels(now)):
+            counts = level * exposure
+            if counts > 0xFFFF:
+                self.status |= as7331.STATUS_ADCOF
+            self.results[i] = int(min(counts, 0xFFFF))
+
+    def _start(self):
+        self.conv_ms = self.time_ms
+        self.conv_start = self.clock()
+        self.conv_end = self.conv_start + self.conv_ms / 1000.0
+        self.delivered = 0
+        self.status = (self.status | as7331.STATUS_NOTREADY) & ~(as7331.STATUS_NDATA | as7331.STATUS_LDATA)
+
+    # register interface used by SimSMBus
+
+    def write(self, register, data):
+        for value in data:
+            self.writes[register] += 1
+            if register == as7331.OSR:
+                self.osr = value & 0x7F
+                if (value & 0x07) == as7331.OSR_MEASURE and value & 0x80:
+                    self._start()
+                elif (value & 0x07) == as7331.OSR_CONFIG:
+                    self.conv_start = None
+            elif (self.osr & 0x07) == as7331.OSR_CONFIG and register < len(self.config):
+                self.config[register] = value
+            register += 1
+
+    def read(self, register, length):
+        if (self.osr & 0x07) != as7331.OSR_MEASURE:
+            regs = bytes([self.osr]) + bytes(self.config[1:])
+            return list(regs[register:register + length])
+        self._update()
+        temp = int((self.temp_c + 66.9) / 0.05) & 0x0FFF
+        outconv = int(self.conv_ms * 1024)
+        words = [self.osr | (self.status << 8), temp] + self.results + [outconv & 0xFFFF, outconv >> 16]
+        raw = b"".join(w.to_bytes(2, "little") for w in words)
+        data = list(raw[register * 2:register * 2 + length])
+        if register == as7331.OSR_STATUS and length >= 2:
+            self.status &= ~(as7331.STATUS_NDATA | as7331.STATUS_LDATA)
+        return data
+
+
+class RecordingSpi:
+    """spidev.SpiDev stand-in that counts traffic and decodes it into a framebuffer.
+
+    dc is the driver's DC output device (its value selects command/data).
+    CASET (0x2A) / RASET (0x2B) set the window and RAMWR (0x2C) pixels are
+    written into framebuffer, indexed [row, column] in the controller's
+    address space (after MADCTL). Other commands keep their last parameters
+    in registers.
+    """
+
+    def __init__(self, gram = (320, 320)):
+        self.max_speed_hz = 0
+        self.mode = 0
+        self.dc = None
+        self.framebuffer = np.zeros(gram, dtype = ">u2")
+        self.transactions = 0
+        self.bytes = 0
+        self.pixel_bytes = 0
+        self.commands = Counter()
+        self.registers = {}
+        self.cmd = None
+        self.params = []
+        self.window = (0, 0, 0, 0)
+        self.pointer = 0
+        self.carry = b""
+
+    def writebytes(self, data):
+        self._feed(bytes(data))
+
+    def writebytes2(self, data):
+        self._feed(bytes(data) if isinstance(data, (list, tuple)) else memoryview(data).cast("B"))
+
+    def close(self):
+        pass
+
+    def _feed(self, data):
+        self.transactions += 1
+        self.bytes += len(data)
+        if self.dc is not None and not self.dc.value:
+            for cmd in data:
+                self._command(cmd)
+            return
+        if self.cmd == 0x2C:
+            self._pixels(data)
+            return
+        self.params.extend(data)
+        self.registers[self.cmd] = bytes(self.params)
+        if self.cmd in (0x2A, 0x2B) and len(self.params) == 4:
+            start = (self.params[0] << 8) | self.params[1]
+            end = (self.params[2] << 8) | self.params[3]
+            x0, y0, x1, y1 = self.window
+            self.window = (start, y0, end, y1) if self.cmd == 0x2A else (x0, start, x1, end)
+
+    def _command(self, cmd):
+        self.commands[cmd] += 1
+        self.cmd = cmd
+        self.params = []
+        if cmd == 0x2C:
+            self.pointer = 0
+            self.carry = b""
+
+    def _pixels(self, data):
+        self.pixel_bytes += len(data)
+        if self.carry:
+            data = self.carry + bytes(data)
+        usable = len(data) & ~1
+        self.carry = bytes(data[usable:])
+        pix = np.frombuffer(data[:usable], dtype = ">u2")
+        x0, y0, x1, y1 = self.window
+        w = x1 - x0 + 1
+        h = y1 - y0 + 1
+        fb_h, fb_w = self.framebuffer.shape
+        if self.pointer % w == 0 and pix.size % w == 0 and self.pointer + pix.size <= w * h \
+                and x1 < fb_w and y1 < fb_h:
+            # whole rows inside the window: plain slice assignment
+            row = y0 + self.pointer // w
+            self.framebuffer[row:row + pix.size // w, x0:x1 + 1] = pix.reshape(-1, w)
+            self.pointer += pix.size
+            return
+        idx = (self.pointer + np.arange(pix.size)) % (w * h)
+        rows, cols = y0 + idx // w, x0 + idx % w
+        keep = (rows < fb_h) & (cols < fb_w)
+        self.framebuffer[rows[keep], cols[keep]] = pix[keep]
+        self.pointer += pix.size
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.pixel_bytes = 0
+        self.commands.clear()
+
+
+def make_display(cls, **kwargs):
+    """Driver instance on gpiozero mock pins with a RecordingSpi as its SPI device"""
+    from gpiozero import Device
+    from gpiozero.pins.mock import MockFactory, MockPWMPin
+    if not isinstance(Device.pin_factory, MockFactory):
+        Device.pin_factory = MockFactory(pin_class = MockPWMPin)
+    spi = RecordingSpi()
+    disp = cls(spi = spi, **kwargs)
+    spi.dc = disp.DC_PIN
+    return disp
+
+
+def close_display(disp):
+    """Release the mock pins of a make_display() instance so another driver can take them"""
+    for pin in (disp.RST_PIN, disp.DC_PIN, disp.BL_PIN):
+        pin.close()
+    if disp.gpio is not None:
+        disp.gpio.close()
+        disp.gpio = None
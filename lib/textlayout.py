@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from .lcdconfig import palette_index
+
+
+class TextLayout:
+    """Text metrics and glyph bitmaps of one PIL font, kept in bounded LRU caches.
+
+    textbbox() returns the same box as ImageDraw.textbbox((0, 0), text, font)
+    and is measured once per string. text() composes a string from cached
+    per-character masks (kerning is not applied), so a changing number costs
+    a few pastes instead of a FreeType render on every frame. On palette
+    images (mode "P") indices cannot be blended, so text is drawn with
+    hard-edged masks rendered without anti-aliasing.
+    """
+
+    def __init__(self, font, max_glyph_bytes = 64 * 1024, max_metrics = 256):
+        self.font = font
+        self.max_glyph_bytes = max_glyph_bytes
+        self.max_metrics = max_metrics
+        self._metrics = OrderedDict()
+        self._glyphs = OrderedDict()
+        self._glyph_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def textbbox(self, text):
+        bb = self._metrics.get(text)
+        if bb is not None:
+            self._metrics.move_to_end(text)
+            self.hits += 1
+            return bb
+        self.misses += 1
+        bb = self._metrics[text] = tuple(self.font.getbbox(text))
+        if len(self._metrics) > self.max_metrics:
+            self._metrics.popitem(last = False)
+        return bb
+
+    def textsize(self, text):
+        bb = self.textbbox(text)
+        return bb[2] - bb[0], bb[3] - bb[1]
+
+    def glyph(self, ch, mode = "L"):
+        """(mask, x offset, y offset, advance) of one character; mask is None for blanks.
+
+        mode is the mask mode: "L" anti-aliased, "1" hard-edged.
+        """
+        key = (ch, mode)
+        g = self._glyphs.get(key)
+        if g is not None:
+            self._glyphs.move_to_end(key)
+            self.hits += 1
+            return g
+        self.misses += 1
+        bb = self.font.getbbox(ch)
+        mask = None
+        if bb[2] > bb[0] and bb[3] > bb[1]:
+            mask = Image.new(mode, (bb[2] - bb[0], bb[3] - bb[1]))
+            ImageDraw.Draw(mask).text((-bb[0], -bb[1]), ch, font = self.font, fill = 255)
+            self._glyph_bytes += mask.width * mask.height
+        g = self._glyphs[key] = (mask, bb[0], bb[1], self.font.getlength(ch))
+        while self._glyph_bytes > self.max_glyph_bytes and len(self._glyphs) > 1:
+            old = self._glyphs.popitem(last = False)[1][0]
+            if old is not None:
+                self._glyph_bytes -= old.width * old.height
+        return g
+
+    def preload(self, chars = "0123456789.,:- ", mode = "L"):
+        for ch in chars:
+            self.glyph(ch, mode)
+
+    def text(self, image, xy, text, fill):
+        """Draw text at xy like ImageDraw.text, from the glyph cache"""
+        x, y = xy
+        mode = "L"
+        if image.mode == "P":
+            mode = "1"
+            fill = palette_index(image, fill)
+        pen = 0.0
+        for ch in text:
+            mask, ox, oy, advance = self.glyph(ch, mode)
+            if mask is not None:
+                image.paste(fill, (x + int(round(pen)) + ox, y + oy), mask)
+            pen += advance
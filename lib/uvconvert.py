@@ -0,0 +1,89 @@
+from .as7331 import TEMP_LSB_C, TEMP_OFFSET_C
+
+# Responsivity in counts per uW/cm2 at gain 2048x and 64 ms (datasheet typ.)
+RE_BASE = (385.0, 347.0, 794.0)
+BASE_GAIN = 2048
+BASE_TIME_MS = 64
+
+GAIN_CODES = 12     # CREG1[7:4]: code c -> gain 2^(11-c)
+TIME_CODES = 16     # CREG1[3:0]: code c -> 2^c ms
+
+
+def gain_of_code(code):
+    return 1 << (11 - code)
+
+
+def time_ms_of_code(code):
+    return 1 << code
+
+
+class Converter:
+    """Raw AS7331 counts -> uW/cm2 through a gain x time responsivity table.
+
+    uW/cm2 = raw * BASE_GAIN * base_time_ms / (Re * gain * time_ms), with one
+    factor per channel precomputed for every (gain code, time code) pair.
+    scalar() looks the factors up by gain multiplier and time in ms (the
+    values czujkaUV works with) and falls back to the formula for other
+    times, e.g. the measured SYND conversion time. batch() converts whole
+    numpy arrays of register codes in one vectorised pass; numpy is only
+    imported there.
+    """
+
+    def __init__(self, re_base = RE_BASE, base_time_ms = BASE_TIME_MS):
+        self.re_base = tuple(float(re) for re in re_base)
+        self.base_time_ms = base_time_ms
+        self._scalar = {}
+        for g in range(GAIN_CODES):
+            for t in range(TIME_CODES):
+                self._scalar[(gain_of_code(g), time_ms_of_code(t))] = self._factors(gain_of_code(g), time_ms_of_code(t))
+        self._table = None
+
+    def _factors(self, gain, time_ms):
+        k = BASE_GAIN * self.base_time_ms / (gain * float(time_ms))
+        return tuple(k / re for re in self.re_base)
+
+    def factors(self, gain, time_ms):
+        """(UVA, UVB, UVC) uW/cm2 per count at a gain multiplier and time in ms"""
+        f = self._scalar.get((gain, time_ms))
+        if f is None:
+            f = self._factors(gain, time_ms)
+        return f
+
+    def scalar(self, uva_raw, uvb_raw, gain, time_ms):
+        fa, fb, _ = self.factors(gain, time_ms)
+        return uva_raw * fa, uvb_raw * fb
+
+    def table(self):
+        """Factor table, shape (GAIN_CODES * TIME_CODES, 3), row = gain_code * TIME_CODES + time_code"""
+        if self._table is None:
+            import numpy as np
+            rows = [self._scalar[(gain_of_code(g), time_ms_of_code(t))]
+                    for g in range(GAIN_CODES) for t in range(TIME_CODES)]
+            self._table = np.array(rows, dtype = np.float64)
+        return self._table
+
+    def batch(self, uva, uvb, uvc, gain_codes, time_codes, temp = None):
+        """Convert arrays of raw counts taken at per-sample gain/time codes.
+
+        Returns (uva, uvb, uvc) in uW/cm2 as float64 arrays, plus the
+        temperature in deg C when raw TEMP register values are given.
+        Scalars work too and give 0-d results. Gain codes 12-15 are not in
+        the table and raise ValueError, as do time codes outside 0-15.
+        """
+        import numpy as np
+        table = self.table()
+        gain_codes = np.asarray(gain_codes, dtype = np.intp)
+        time_codes = np.asarray(time_codes, dtype = np.intp)
+        for name, codes, n in (("gain", gain_codes, GAIN_CODES), ("time", time_codes, TIME_CODES)):
+            if codes.size and (codes.min() < 0 or codes.max() >= n):
+                raise ValueError("{} codes must be 0..{}, got {}..{}".format(name, n - 1, codes.min(), codes.max()))
+        row = gain_codes * TIME_CODES + time_codes
+        out = []
+        for c, raw in enumerate((uva, uvb, uvc)):
+            out.append(np.multiply(np.asarray(raw), table[:, c].take(row)))
+        if temp is not None:
+            t = np.bitwise_and(np.asarray(temp), 0x0FFF).astype(np.float64)
+            t *= TEMP_LSB_C
+            t += TEMP_OFFSET_C
+            out.append(t)
+        return tuple(out)
@@ -0,0 +1,135 @@
+# uW/cm2 * s -> J/m2
+UW_CM2_S_TO_J_M2 = 0.01
+
+# Approximate broad-band erythemal (CIE) weights of the AS7331 UVA and UVB
+# channels for sunlight; other sources need their own factors
+ERYTHEMAL_UVA = 0.0008
+ERYTHEMAL_UVB = 0.15
+
+# UV index = 40 m2/W * erythemally weighted irradiance
+UVI_PER_UW_CM2 = 40 * 0.01
+
+CHANNELS = ("uva", "uvb", "ery")
+
+# Default dose limits in J/m2 per (channel, window in s): ICNIRP 8 h limits,
+# 30 J/m2 effective (erythemal weighting used as the approximation) and
+# 10 kJ/m2 UVA
+DOSE_LIMITS = {
+    ("ery", 8 * 3600): 30.0,
+    ("uva", 8 * 3600): 10000.0,
+}
+
+
+class RollingSum:
+    """Sum of values over the last `seconds`, in `buckets` fixed time slices.
+
+    add() is O(1) (amortised over elapsed slices) whatever the sample rate,
+    and memory does not grow with it; the window edge moves in steps of
+    seconds / buckets.
+    """
+
+    def __init__(self, seconds, channels, buckets = 60):
+        self.seconds = seconds
+        self.width = seconds / buckets
+        self.buckets = [[0.0] * channels for _ in range(buckets)]
+        self.total = [0.0] * channels
+        self.current = None
+
+    def advance(self, t):
+        """Move the window so its newest slice contains t"""
+        idx = int(t // self.width)
+        if self.current is None:
+            self.current = idx
+        n = len(self.buckets)
+        # expire every slice between the last one used and idx (at most all of them)
+        for k in range(self.current + 1, min(idx, self.current + n) + 1):
+            bucket = self.buckets[k % n]
+            for c, value in enumerate(bucket):
+                self.total[c] -= value
+                bucket[c] = 0.0
+        if idx > self.current:
+            self.current = idx
+
+    def add(self, t, values):
+        self.advance(t)
+        bucket = self.buckets[self.current % len(self.buckets)]
+        for c, value in enumerate(values):
+            bucket[c] += value
+            self.total[c] += value
+
+
+class DoseEngine:
+    """Accumulated UV dose from a stream of irradiance samples (uW/cm2).
+
+    Between two samples the irradiance is integrated with the trapezoidal
+    rule over the real time between them. The first sample, and any sample
+    after a gap longer than max_gap seconds, only counts its own
+    integration time (the sensor did not see the light in between).
+    Besides UVA and UVB an erythemally weighted channel ("ery") is kept.
+
+    Doses are in J/m2: total since start, rolling over each window (seconds)
+    and over each limit window, even one not listed in windows. feed() is
+    O(1) per sample and returns the limits that were crossed by this
+    sample; `alarms` holds all limits currently exceeded.
+    """
+
+    def __init__(self, windows = (60, 15 * 60, 8 * 3600), limits = None, max_gap = 10.0,
+                 weights = (ERYTHEMAL_UVA, ERYTHEMAL_UVB)):
+        self.windows = tuple(windows)
+        self.limits = dict(DOSE_LIMITS if limits is None else limits)
+        self.max_gap = max_gap
+        self.weights = weights
+        for channel, window in self.limits:
+            if channel not in CHANNELS:
+                raise ValueError("unknown dose channel {!r} in limits, expected one of {}".format(
+                    channel, ", ".join(CHANNELS)))
+        # every limit window is tracked, also when it is not listed in windows
+        tracked = self.windows + tuple(w for _, w in self.limits if w is not None and w not in self.windows)
+        self.rolling = {w: RollingSum(w, len(CHANNELS)) for w in tracked}
+        self.total = [0.0] * len(CHANNELS)
+        self.irradiance = [0.0] * len(CHANNELS)
+        self.alarms = set()
+        self._last_t = None
+        self._index = {name: i for i, name in enumerate(CHANNELS)}
+
+    def feed(self, t, uva, uvb, time_ms):
+        """Add a sample taken at t (s) with integration time time_ms"""
+        wa, wb = self.weights
+        e = (uva, uvb, wa * uva + wb * uvb)
+        dt = None if self._last_t is None else t - self._last_t
+        if dt is None or dt <= 0 or dt > self.max_gap:
+            dose = [x * time_ms / 1000.0 * UW_CM2_S_TO_J_M2 for x in e]
+        else:
+            dose = [(prev + x) * 0.5 * dt * UW_CM2_S_TO_J_M2 for prev, x in zip(self.irradiance, e)]
+        self._last_t = t
+        self.irradiance = list(e)
+
+        for c, d in enumerate(dose):
+            self.total[c] += d
+        for rolling in self.rolling.values():
+            rolling.add(t, dose)
+
+        raised = []
+        for key, limit in self.limits.items():
+            over = self.dose(*key) >= limit
+            if over and key not in self.alarms:
+                self.alarms.add(key)
+                raised.append(key)
+            elif not over:
+                self.alarms.discard(key)
+        return raised
+
+    def dose(self, channel, window = None):
+        """Dose in J/m2 over the window (s), or since start for None"""
+        c = self._index[channel]
+        if window is None:
+            return self.total[c]
+        rolling = self.rolling.get(window)
+        if rolling is None:
+            raise ValueError("no rolling dose over {} s, tracked windows are {}".format(
+                window, ", ".join(str(w) for w in self.rolling)))
+        return max(0.0, rolling.total[c])
+
+    def uv_index(self):
+        """UV index of the last sample (erythemal irradiance * 40 m2/W)"""
+        return self.irradiance[2] * UVI_PER_UW_CM2
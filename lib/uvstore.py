@@ -0,0 +1,193 @@
+import mmap
+import os
+import struct
+import time
+
+# One sample: time (unix s), gain, integration time (ms), raw UVA/UVB/UVC,
+# converted UVA/UVB (uW/cm2), AS7331 STATUS byte
+RECORD = struct.Struct("<dHHHHHffBx")
+FIELDS = ("t", "gain", "time_ms", "uva", "uvb", "uvc", "uva_uW", "uvb_uW", "status")
+
+# Segment header: magic, format version, record size, creation time
+HEADER = struct.Struct("<4sHHd")
+MAGIC = b"UVS1"
+VERSION = 1
+SUFFIX = ".uvs"
+
+
+def segment_name(t):
+    """File name of a segment starting at t; sorts in time order"""
+    return "{:015d}{}".format(int(t * 1000), SUFFIX)
+
+
+def segment_start(name):
+    return int(name[:-len(SUFFIX)]) / 1000.0
+
+
+def list_segments(directory):
+    """Segment file names in time order"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(n for n in names if n.endswith(SUFFIX) and n[:-len(SUFFIX)].isdigit())
+
+
+class UVStore:
+    """Append-only store of samples in fixed-width binary segments.
+
+    Records are packed into an in-memory batch and written with one write()
+    and one fsync() per batch (flush_records records or flush_interval
+    seconds, whichever comes first), so the SD card sees a few large writes
+    instead of one per sample. A crash loses at most the unflushed batch; a
+    torn record at the end of a segment is ignored by the reader.
+
+    A segment is closed at segment_bytes and a new one started. After each
+    rotation whole segments older than retention_s, and the oldest segments
+    beyond max_bytes in total, are deleted. Range queries binary-search the
+    time column, so t should not go backwards (use a synced clock).
+    """
+
+    def __init__(self, directory, segment_bytes = 1 << 20, retention_s = None, max_bytes = None,
+                 flush_records = 256, flush_interval = 60.0):
+        self.directory = directory
+        self.segment_bytes = max(segment_bytes, HEADER.size + RECORD.size)
+        self.retention_s = retention_s
+        self.max_bytes = max_bytes
+        self.flush_records = max(1, flush_records)
+        self.flush_interval = flush_interval
+        self._batch = bytearray(RECORD.size * self.flush_records)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._current = None
+        self._size = 0
+        self.records = 0
+        self.writes = 0
+        self.fsyncs = 0
+        os.makedirs(directory, exist_ok = True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, t, gain, time_ms, uva, uvb, uvc, uva_uW, uvb_uW, status = 0):
+        RECORD.pack_into(self._batch, self._pending * RECORD.size, t, gain, time_ms,
+                         uva, uvb, uvc, uva_uW, uvb_uW, status)
+        self._pending += 1
+        self.records += 1
+        if self._pending == self.flush_records or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the pending batch and fsync it, rotating segments as they fill"""
+        self._last_flush = time.monotonic()
+        done = 0
+        while done < self._pending:
+            if self._file is None or self._size + RECORD.size > self.segment_bytes:
+                first = RECORD.unpack_from(self._batch, done * RECORD.size)[0]
+                self._rotate(first)
+            room = (self.segment_bytes - self._size) // RECORD.size
+            n = min(room, self._pending - done)
+            self._file.write(memoryview(self._batch)[done * RECORD.size:(done + n) * RECORD.size])
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.writes += 1
+            self.fsyncs += 1
+            self._size += n * RECORD.size
+            done += n
+        self._pending = 0
+
+    def close(self):
+        if self._pending:
+            self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self, t):
+        if self._file is not None:
+            self._file.close()
+        name = segment_name(t)
+        existing = list_segments(self.directory)
+        if existing and name <= existing[-1]:
+            # clock went back (or two segments within a ms): keep names in order
+            name = segment_name(segment_start(existing[-1]) + 0.001)
+        path = os.path.join(self.directory, name)
+        self._file = open(path, "wb", buffering = 0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, time.time()))
+        self._size = HEADER.size
+        self._current = name
+        self.enforce_retention(t)
+
+    def enforce_retention(self, now = None):
+        """Delete whole segments past retention_s or beyond max_bytes; never the open one"""
+        names = [n for n in list_segments(self.directory) if n != self._current]
+        if self.retention_s is not None:
+            limit = (time.time() if now is None else now) - self.retention_s
+            everything = list_segments(self.directory)
+            for name in names[:]:
+                # a segment ends where the next one starts
+                later = everything[everything.index(name) + 1:]
+                if later and segment_start(later[0]) < limit:
+                    os.remove(os.path.join(self.directory, name))
+                    names.remove(name)
+        if self.max_bytes is not None:
+            sizes = {n: os.path.getsize(os.path.join(self.directory, n)) for n in names}
+            total = sum(sizes.values()) + self._size
+            for name in names:
+                if total <= self.max_bytes:
+                    break
+                os.remove(os.path.join(self.directory, name))
+                total -= sizes[name]
+
+
+def record_dtype():
+    import numpy as np
+    return np.dtype({
+        "names": list(FIELDS),
+        "formats": ["<f8", "<u2", "<u2", "<u2", "<u2", "<u2", "<f4", "<f4", "u1"],
+        "offsets": [0, 8, 10, 12, 14, 16, 18, 22, 26],
+        "itemsize": RECORD.size,
+    })
+
+
+def read_segment(path, start = None, end = None):
+    """Records of one segment with start <= t < end, via mmap (copied out)"""
+    import numpy as np
+    dtype = record_dtype()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        count = (size - HEADER.size) // RECORD.size
+        if count <= 0:
+            return np.empty(0, dtype = dtype)
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as m:
+            magic, version, record_size, _ = HEADER.unpack_from(m, 0)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError("{}: not a version {} UV segment".format(path, VERSION))
+            records = np.frombuffer(m, dtype = dtype, count = count, offset = HEADER.size)
+            t = records["t"]
+            lo = 0 if start is None else int(np.searchsorted(t, start, "left"))
+            hi = count if end is None else int(np.searchsorted(t, end, "left"))
+            out = records[lo:hi].copy()
+            del records, t
+            return out
+
+
+def query(directory, start = None, end = None):
+    """All stored records with start <= t < end as a numpy structured array"""
+    import numpy as np
+    names = list_segments(directory)
+    parts = []
+    for i, name in enumerate(names):
+        # skip segments that end before start or begin after end
+        if start is not None and i + 1 < len(names) and segment_start(names[i + 1]) < start:
+            continue
+        if end is not None and segment_start(name) >= end:
+            break
+        parts.append(read_segment(os.path.join(directory, name), start, end))
+    if not parts:
+        return np.empty(0, dtype = record_dtype())
+    return np.concatenate(parts)
@@ -3,6 +3,7 @@ import sys
 import st7789
 from PIL import Image, ImageDraw, ImageFont
 from smbus2 import SMBus
+from lib import as7331
 
 # --- KONFIGURACJA EKRANU ---
 DC_PIN = 25
@@ -19,26 +20,21 @@ class AS7331_MiniDriver:
         
     def start_measurement(self):
         try:
-            # Rejestr 0x00 (OSR) -> Wpisujemy 0x02 (Tryb Command/Measurement)
-            # To budzi czujnik i każe mu wykonać jeden pomiar
-            self.bus.write_byte_data(self.address, 0x00, 0x02) 
+            # OSR = 0x02 budzi czujnik w stanie konfiguracji, OSR = 0x83 (SS=1)
+            # przechodzi do stanu pomiaru i startuje jeden pomiar (domyślny tryb CMD);
+            # dopiero w stanie pomiaru rejestry od 0x00 to STATUS i wyniki
+            self.bus.write_byte_data(self.address, as7331.OSR, as7331.OSR_CONFIG)
+            self.bus.write_byte_data(self.address, as7331.OSR, as7331.OSR_START)
             return True
         except Exception:
             return False
 
     def read_values(self):
         try:
-            # Odczytujemy 6 bajtów danych zaczynając od rejestru 0x02
-            # 0x02 = UVA LSB, 0x03 = UVA MSB
-            # 0x04 = UVB LSB, 0x05 = UVB MSB
-            # 0x06 = UVC LSB, 0x07 = UVC MSB
-            data = self.bus.read_i2c_block_data(self.address, 0x02, 6)
-            
-            # Konwersja dwóch bajtów na liczbę (Little Endian)
-            uva = data[0] | (data[1] << 8)
-            uvb = data[2] | (data[3] << 8)
-            uvc = data[4] | (data[5] << 8)
-            return uva, uvb, uvc
+            # Jeden odczyt I2C od rejestru 0x00: OSR/STATUS, TEMP, UVA, UVB, UVC
+            # (wspólna mapa rejestrów w lib/as7331.py)
+            m = as7331.read_burst(self.bus, self.address)
+            return m.uva, m.uvb, m.uvc
         except Exception as e:
             print(f"Błąd I2C: {e}")
             return 0, 0, 0